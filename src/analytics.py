@@ -1,22 +1,212 @@
+from datetime import date, timedelta
+from math import sqrt
+
+import bitmaps
+
 # Return all habit objects from the tracker
 def get_all_habits(tracker):
     return tracker.get_habits()
 
 # Filter habits by their periodicity (daily or weekly)
-def get_habits_by_periodicity(tracker, periodicity):
+# engine is an optional BatchAnalytics built over the same habits
+def get_habits_by_periodicity(tracker, periodicity, engine=None):
+    if engine is not None:
+        return engine.by_periodicity(periodicity)
     return [h for h in tracker.get_habits() if h.periodicity == periodicity]
 
 # Find and return the habit with the longest streak
-def get_longest_streak(tracker):
+def get_longest_streak(tracker, store=None, engine=None):
     habits = tracker.get_habits()
     if not habits:
         return None
+    if engine is not None:
+        return engine.top_current_streak()
+    if store is not None:
+        # Streaks are computed in SQL; only the winner is looked up in memory
+        streaks = store.streaks()
+        name = max(streaks, key=lambda n: streaks[n][0], default=None)
+        return tracker.find_habit(name) if name is not None else None
     # Use max with a key function to find the habit with the longest streak
     return max(habits, key=lambda h: h.get_streak(), default=None)
 
 # Get the longest streak for a specific habit by name
-def get_longest_streak_for_habit(tracker, name):
+def get_longest_streak_for_habit(tracker, name, store=None):
+    if store is not None:
+        streak = store.streaks().get(name)
+        return streak[0] if streak else None
     habit = tracker.find_habit(name)
     if habit:
         return habit.get_streak()
     return None
+
+# Count the distinct days a habit was completed, optionally within [start, end]
+def count_completions(tracker, name, start=None, end=None, store=None):
+    if store is not None:
+        return store.count_completions(name, start, end)
+    habit = tracker.find_habit(name)
+    if habit:
+        return habit.count_completions(start, end)
+    return None
+
+# Map each habit name to the percentage of days since creation it was completed
+def get_completion_rates(tracker, store=None, engine=None):
+    if store is not None:
+        return store.completion_rates()
+    if engine is not None:
+        return engine.completion_rates()
+    today = date.today().toordinal()
+    return {h.name: habit_completion_rate(h, today) for h in tracker.get_habits()}
+
+# Percentage of days from creation to `today` (an ordinal, default today) on which one habit
+# was completed; a single entry of get_completion_rates
+def habit_completion_rate(habit, today=None):
+    today = today or date.today().toordinal()
+    total = today - date.fromisoformat(habit.creation_dt[:10]).toordinal() + 1
+    completed = habit.count_completions()
+    return round(completed / total * 100, 2) if completed and total > 0 else 0
+
+# Chunked form of a per-habit analysis for long runs (see jobs.py): yields (done, total,
+# {name: fn(habit)} so far) after every `chunk` habits, so a caller can report progress and
+# stop between chunks; the last dict yielded is complete
+def iter_per_habit(tracker, fn, chunk=256):
+    habits = tracker.get_habits()
+    result = {}
+    if not habits:
+        yield 0, 0, result
+    for start in range(0, len(habits), chunk):
+        for h in habits[start:start + chunk]:
+            result[h.name] = fn(h)
+        yield min(start + chunk, len(habits)), len(habits), result
+
+# Chunked get_completion_rates; a store answers in one step
+def iter_completion_rates(tracker, chunk=256, store=None):
+    if store is not None:
+        yield 1, 1, store.completion_rates()
+        return
+    today = date.today().toordinal()
+    yield from iter_per_habit(tracker, lambda h: habit_completion_rate(h, today), chunk)
+
+# Chunked get_longest_streak: yields (done, total, habit with the longest streak so far)
+def iter_longest_streak(tracker, chunk=256, store=None):
+    habits = tracker.get_habits()
+    if store is not None or not habits:
+        yield 1, 1, get_longest_streak(tracker, store=store)
+        return
+    best, longest = None, -1
+    for start in range(0, len(habits), chunk):
+        for h in habits[start:start + chunk]:
+            streak = h.get_streak()
+            if streak > longest:  # ties go to the first, like max()
+                best, longest = h, streak
+        yield min(start + chunk, len(habits)), len(habits), best
+
+# Percentage of days a habit was completed within [start, end] (dates), clipped to its lifetime
+def get_completion_rate_between(tracker, name, start=None, end=None):
+    habit = tracker.find_habit(name)
+    if habit:
+        return habit.completion_rate(start, end)
+    return None
+
+# Completed days per ISO week ('weekly') or calendar month ('monthly') within [start, end],
+# as (first day of the period, count) pairs; each period is one O(1) range query
+def get_rollup(tracker, name, period, start, end):
+    habit = tracker.find_habit(name)
+    if habit is None:
+        return None
+    if period == 'weekly':
+        first = start - timedelta(days=start.weekday())
+    elif period == 'monthly':
+        first = start.replace(day=1)
+    else:
+        raise ValueError(f"Invalid rollup period: {period!r}")
+    rollup = []
+    while first <= end:
+        if period == 'weekly':
+            following = first + timedelta(days=7)
+        else:
+            following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+        last = following - timedelta(days=1)
+        rollup.append((first, habit.count_completions(max(first, start), min(last, end))))
+        first = following
+    return rollup
+
+# One (date, completed) pair per day of a calendar year, for the heatmap
+def get_year_heatmap(tracker, name, year):
+    habit = tracker.find_habit(name)
+    if habit is None:
+        return None
+    start = date(year, 1, 1)
+    counts = habit.daily_counts(start, date(year, 12, 31))
+    return [(start + timedelta(days=i), count) for i, count in enumerate(counts)]
+
+
+# Pick habits by name, defaulting to every habit with the given periodicity
+def _select(tracker, names, periodicity):
+    if names is None:
+        return [h for h in tracker.get_habits() if periodicity is None or h.periodicity == periodicity]
+    habits = [tracker.find_habit(n) for n in names]
+    return [h for h in habits if h is not None]
+
+# Dates in [start, end] on which every selected habit (default: all daily habits) was completed,
+# one AND per habit over the completion bitmaps
+def get_days_all_completed(tracker, names=None, periodicity='daily', start=None, end=None):
+    habits = _select(tracker, names, periodicity)
+    if not habits:
+        return []
+    bits = habits[0].completion_bits
+    for h in habits[1:]:
+        bits &= h.completion_bits
+        if not bits:
+            return []
+    bits &= bitmaps.window((start or date.min).toordinal(), (end or date.today()).toordinal())
+    return [date.fromordinal(d) for d in bitmaps.to_days(bits)]
+
+# Dates in [start, end] on which at least one selected habit was completed
+def get_days_any_completed(tracker, names=None, periodicity=None, start=None, end=None):
+    bits = 0
+    for h in _select(tracker, names, periodicity):
+        bits |= h.completion_bits
+    bits &= bitmaps.window((start or date.min).toordinal(), (end or date.today()).toordinal())
+    return [date.fromordinal(d) for d in bitmaps.to_days(bits)]
+
+# Pairwise co-completion as {(name, name): phi coefficient} between -1 and 1, each pair compared
+# over the days since the later of the two was created; None where either habit never varies
+def get_co_completion(tracker, names=None, periodicity=None):
+    habits = _select(tracker, names, periodicity)
+    today = date.today().toordinal()
+    created = [date.fromisoformat(h.creation_dt[:10]).toordinal() for h in habits]
+    bits = [h.completion_bits for h in habits]
+    result = {}
+    for i, a in enumerate(habits):
+        for j in range(i + 1, len(habits)):
+            mask = bitmaps.window(max(created[i], created[j]), today)
+            n = bitmaps.popcount(mask)
+            x, y = bits[i] & mask, bits[j] & mask
+            nx, ny = bitmaps.popcount(x), bitmaps.popcount(y)
+            spread = nx * (n - nx) * ny * (n - ny)
+            phi = (n * bitmaps.popcount(x & y) - nx * ny) / sqrt(spread) if spread else None
+            result[(a.name, habits[j].name)] = round(phi, 4) if phi is not None else None
+    return result
+
+# Percentage of each weekday (Monday first) that was completed, summed over the selected habits
+# within [start, end] and their lifetimes
+def get_weekday_rates(tracker, names=None, periodicity=None, start=None, end=None):
+    habits = _select(tracker, names, periodicity)
+    last = min((end or date.today()).toordinal(), date.today().toordinal())
+    masks = [bitmaps.weekday_mask(w, last) for w in range(7)]
+    done, possible = [0] * 7, [0] * 7
+    for h in habits:
+        first = max(date.fromisoformat(h.creation_dt[:10]).toordinal(), (start or date.min).toordinal())
+        bits = h.completion_bits & bitmaps.window(first, last)
+        for w in range(7):
+            done[w] += bitmaps.popcount(bits & masks[w])
+            possible[w] += bitmaps.weekdays_between(w, max(first, bitmaps.EPOCH), last)
+    return [round(d / p * 100, 2) if p else 0 for d, p in zip(done, possible)]
+
+# The weekday (0 = Monday) with the highest completion rate and that rate, or None without data
+def get_best_weekday(tracker, names=None, periodicity=None, start=None, end=None):
+    rates = get_weekday_rates(tracker, names, periodicity, start, end)
+    if not any(rates):
+        return None
+    best = max(range(7), key=lambda w: rates[w])
+    return best, rates[best]
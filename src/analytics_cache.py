@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from datetime import date
+
+import analytics
+
+
+class AnalyticsCache:
+    """Bounded LRU cache for analytics results.
+
+    Keys include the habit's or tracker's version counter, so a mutation makes
+    the old entries unreachable and they simply age out of the LRU order.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, compute):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = self._data[key] = compute()
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def peek(self, key):
+        # (True, value) if cached, else (False, None); for results computed elsewhere (jobs.py)
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return True, value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+
+cache = AnalyticsCache()
+
+# Habits and trackers are keyed by identity (they don't define __eq__); rates and
+# streaks over the whole tracker also depend on today's date, so it is part of their keys.
+
+def streak(habit):
+    return cache.get(('streak', habit, habit.version), habit.get_streak)
+
+def longest_streak(habit):
+    return cache.get(('longest', habit, habit.version), habit.get_longest_streak)
+
+def completion_rate(habit):
+    def compute():
+        total = date.today().toordinal() - date.fromisoformat(habit.creation_dt[:10]).toordinal() + 1
+        completed = habit.count_completions()
+        return round(completed / total * 100, 2) if completed and total > 0 else 0
+    return cache.get(('rate', habit, habit.version, date.today()), compute)
+
+def _tracker_key(kind, tracker, store):
+    return (kind, tracker, tracker.version, store, date.today())
+
+def lookup(kind, tracker, store=None):
+    # A tracker-wide result cached for the current version, as (found, value), so a caller
+    # can skip starting a background job for it
+    return cache.peek(_tracker_key(kind, tracker, store))
+
+def remember(kind, tracker, store, value):
+    # Cache a tracker-wide result computed elsewhere; call it while tracker.version still
+    # matches the data the result came from
+    cache.put(_tracker_key(kind, tracker, store), value)
+
+def get_longest_streak(tracker, store=None):
+    return cache.get(_tracker_key('top', tracker, store),
+                     lambda: analytics.get_longest_streak(tracker, store=store))
+
+def get_completion_rates(tracker, store=None):
+    return cache.get(_tracker_key('rates', tracker, store),
+                     lambda: analytics.get_completion_rates(tracker, store=store))
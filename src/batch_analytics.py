@@ -0,0 +1,135 @@
+from datetime import date, datetime
+from streaks import cadence
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; analytics.py keeps its per-habit path without it
+    np = None
+
+EPOCH = date(1970, 1, 1).toordinal()
+KINDS = {'daily': 0, 'weekly': 1, 'monthly': 2}
+CADENCE = 3
+
+
+class BatchAnalytics:
+    """Vectorized streak and rate analytics over many habits at once.
+
+    All completion days are packed into one flat int32 array (habit after
+    habit, each sorted and de-duplicated) with per-habit offsets, so every
+    metric is a handful of NumPy passes instead of a Python loop per habit.
+    """
+
+    def __init__(self, habits):
+        if np is None:
+            raise ImportError("BatchAnalytics requires numpy")
+        self.habits = list(habits)
+        lengths = np.fromiter((len(h.completion_days) for h in self.habits), dtype=np.int64, count=len(self.habits))
+        self.lengths = lengths
+        self.offsets = np.zeros(len(self.habits) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+        self.days = np.empty(self.offsets[-1], dtype=np.int32)
+        for h, start, end in zip(self.habits, self.offsets[:-1], self.offsets[1:]):
+            self.days[start:end] = np.frombuffer(h.completion_days, dtype=np.int32)
+        self.creation = np.fromiter(
+            (datetime.fromisoformat(h.creation_dt).toordinal() for h in self.habits),
+            dtype=np.int32, count=len(self.habits)
+        )
+        self.periodicity = np.array([h.periodicity for h in self.habits], dtype=object)
+        # Period kind per habit (see KINDS) and the N of '<N>-day' cadences
+        self.cadence = np.fromiter((cadence(p) or 1 for p in self.periodicity), dtype=np.int64, count=len(self.habits))
+        self.kind = np.fromiter((KINDS.get(p, CADENCE) for p in self.periodicity), dtype=np.int8, count=len(self.habits))
+        self._streaks = None
+
+    @classmethod
+    def from_tracker(cls, tracker):
+        return cls(tracker.get_habits())
+
+    def _buckets(self, owner):
+        # Same period numbering as streaks.bucket_of, up to a constant per periodicity
+        days = self.days.astype(np.int64)
+        kind = self.kind[owner]
+        buckets = days.copy()
+        weekly = kind == KINDS['weekly']
+        buckets[weekly] = (days[weekly] - 1) // 7
+        monthly = kind == KINDS['monthly']
+        buckets[monthly] = (days[monthly] - EPOCH).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        custom = kind == CADENCE
+        buckets[custom] = (days[custom] - self.creation[owner[custom]]) // self.cadence[owner[custom]]
+        return buckets
+
+    def _compute_streaks(self):
+        n = len(self.habits)
+        current = np.zeros(n, dtype=np.int64)
+        longest = np.zeros(n, dtype=np.int64)
+        if len(self.days):
+            owner = np.repeat(np.arange(n), self.lengths)
+            buckets = self._buckets(owner)
+            # Days are sorted, so repeated periods within a habit are adjacent
+            keep = np.ones(len(buckets), dtype=bool)
+            keep[1:] = (buckets[1:] != buckets[:-1]) | (owner[1:] != owner[:-1])
+            buckets, owner = buckets[keep], owner[keep]
+            ends = np.cumsum(np.bincount(owner, minlength=n))
+
+            # A run starts at each habit's first period and wherever the gap is not exactly one
+            starts = np.ones(len(buckets), dtype=bool)
+            starts[1:] = (np.diff(buckets) != 1) | (owner[1:] != owner[:-1])
+            run_id = np.cumsum(starts) - 1
+            run_len = np.bincount(run_id)
+            run_owner = owner[starts]
+
+            nonempty = self.lengths > 0
+            first_run = np.searchsorted(run_owner, np.arange(n))
+            longest[nonempty] = np.maximum.reduceat(run_len, first_run[nonempty])
+            current[nonempty] = run_len[run_id[ends[nonempty] - 1]]
+        self._streaks = current, longest
+
+    def current_streaks(self):
+        if self._streaks is None:
+            self._compute_streaks()
+        return self._streaks[0]
+
+    def longest_streaks(self):
+        if self._streaks is None:
+            self._compute_streaks()
+        return self._streaks[1]
+
+    def completion_rates(self, today=None):
+        # Same definition as analytics.get_completion_rates: distinct days / days since creation
+        today = (today or date.today()).toordinal()
+        total = today - self.creation.astype(np.int64) + 1
+        raw = np.zeros(len(self.habits))
+        valid = (self.lengths > 0) & (total > 0)
+        raw[valid] = self.lengths[valid] / total[valid] * 100
+        return {h.name: round(float(r), 2) for h, r in zip(self.habits, raw)}
+
+    def period_counts(self, period, start, end):
+        """Completed days per habit per 'day', 'week' or 'month' bucket in [start, end].
+
+        Returns an (n_habits, n_buckets) matrix; weeks are Monday-aligned.
+        """
+        lo, hi = start.toordinal(), end.toordinal()
+        if period == 'day':
+            bucket = lambda d: d - lo
+        elif period == 'week':
+            bucket = lambda d: (d - 1) // 7 - (lo - 1) // 7
+        elif period == 'month':
+            month = lambda d: (d - EPOCH).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+            first = month(np.array([lo]))[0]
+            bucket = lambda d: month(d) - first
+        else:
+            raise ValueError(f"Unknown period: {period}")
+        n_buckets = int(bucket(np.array([hi]))[0]) + 1
+        owner = np.repeat(np.arange(len(self.habits)), self.lengths)
+        mask = (self.days >= lo) & (self.days <= hi)
+        flat = owner[mask] * n_buckets + bucket(self.days[mask].astype(np.int64))
+        counts = np.bincount(flat, minlength=len(self.habits) * n_buckets)
+        return counts.reshape(len(self.habits), n_buckets)
+
+    def by_periodicity(self, periodicity):
+        return [self.habits[i] for i in np.flatnonzero(self.periodicity == periodicity)]
+
+    def top_current_streak(self):
+        # Habit with the highest current streak; ties go to the first, like max()
+        if not self.habits:
+            return None
+        return self.habits[int(np.argmax(self.current_streaks()))]
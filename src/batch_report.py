@@ -0,0 +1,147 @@
+"""Per-user streak and completion report over many data files.
+
+    python batch_report.py users/ -o report.csv
+    python batch_report.py users/*/data.json --format json --workers 8 -o report.json
+
+Each argument is a data file or a directory searched recursively for *.json,
+plus *.journal files with no snapshot next to them (users who never saved).
+Files are spread over a process pool and one row per file is written as soon as
+it is ready, so memory stays bounded however many files there are. A user's
+journal is the file's sibling with a .journal suffix (data.json -> data.journal).
+A file that can't be read or analysed gets its error in the `error` column and
+the run goes on. Throughput is reported on stderr.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import analytics
+from data_manager import DataManager
+from tracker import HabitTracker
+
+FIELDS = ('file', 'habits', 'completions', 'top_habit', 'current_streak', 'longest_streak',
+          'mean_rate', 'error')
+
+
+def iter_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                names = set(files)
+                for name in sorted(files):
+                    stem, ext = os.path.splitext(name)
+                    if ext == '.json' or (ext == '.journal' and stem + '.json' not in names):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def report_file(path):
+    # Runs in a worker process; DataManager's paths are per-process state there
+    row = dict.fromkeys(FIELDS, '')
+    row['file'] = path
+    stem, ext = os.path.splitext(path)
+    DataManager.FILE = stem + '.json' if ext == '.journal' else path  # a journal alone: no snapshot yet
+    DataManager.JOURNAL = stem + '.journal'
+    try:
+        tracker = HabitTracker()
+        tracker.habits = DataManager.read_data()
+        habits = tracker.get_habits()
+        top = analytics.get_longest_streak(tracker)
+        rates = analytics.get_completion_rates(tracker)
+        row.update(
+            habits=len(habits),
+            completions=sum(h.count_completions() for h in habits),
+            top_habit=top.name if top else '',
+            current_streak=top.get_streak() if top else 0,
+            longest_streak=max((h.get_longest_streak() for h in habits), default=0),
+            mean_rate=round(sum(rates.values()) / len(rates), 2) if rates else 0,
+        )
+    except Exception as e:
+        # One bad file must not end the whole run; it is reported in its row instead
+        row['error'] = f'{type(e).__name__}: {e}'
+    return row
+
+
+class CsvWriter:
+    def __init__(self, f):
+        self._writer = csv.DictWriter(f, FIELDS)
+        self._writer.writeheader()
+
+    def write(self, row):
+        self._writer.writerow(row)
+
+    def close(self):
+        pass
+
+
+class JsonWriter:
+    # A JSON array written one element at a time
+    def __init__(self, f):
+        self._f = f
+        self._first = True
+        f.write('[')
+
+    def write(self, row):
+        self._f.write(('\n' if self._first else ',\n') + json.dumps(row))
+        self._first = False
+
+    def close(self):
+        self._f.write('\n]\n')
+
+
+def run(paths, out, fmt='csv', workers=None, window=None):
+    """Report every file in `paths` to `out`; returns (files, errors, seconds)."""
+    writer = (JsonWriter if fmt == 'json' else CsvWriter)(out)
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    files = errors = 0
+
+    def drain(done):
+        nonlocal files, errors
+        for future in done:
+            row = future.result()
+            writer.write(row)
+            files += 1
+            errors += bool(row['error'])
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded number of files in flight instead of submitting them all up front
+        pending = set()
+        for path in iter_files(paths):
+            pending.add(pool.submit(report_file, path))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                drain(done)
+        drain(wait(pending).done)
+    writer.close()
+    return files, errors, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='data files or directories of them')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('-o', '--output', help='write the report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        files, errors, seconds = run(args.paths, out, args.format, args.workers)
+    finally:
+        if args.output:
+            out.close()
+    rate = files / seconds if seconds else 0
+    print(f'{files} files ({errors} failed) in {seconds:.2f}s, {rate:.1f} files/s', file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Measure cold start of the Habit Tracker entry points.
+
+Each run launches the app with HABIT_STARTUP_PROBE set to a temporary file;
+the app writes a timestamp there on its first event-loop iteration and exits. Wall-clock time is
+measured from process spawn to that timestamp. Source entry points are run
+under `python -X importtime`, and the top-level imports are summarised.
+
+    python bench_startup.py                        # gui.py and main.py
+    python bench_startup.py --frozen ../dist/main.exe --runs 10 -o startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr):
+    # Top-level imports only; nested ones are already in their parent's cumulative time
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue
+        name = name.strip()
+        totals[name] = totals.get(name, 0) + int(cumulative) / 1000
+    return totals
+
+
+def run_once(command, cwd):
+    # The probe goes through a file: windowed builds have no stdout to print to
+    fd, probe = tempfile.mkstemp(prefix="startup-", suffix=".txt")
+    os.close(fd)
+    try:
+        env = dict(os.environ, HABIT_STARTUP_PROBE=probe)
+        start = time.time()
+        proc = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+        with open(probe) as f:
+            stamp = f.read().strip()
+    finally:
+        os.remove(probe)
+    if not stamp:
+        raise RuntimeError(f"{command[-1]} exited without reaching the event loop:\n{proc.stderr[-2000:]}")
+    return float(stamp) - start, proc.stderr
+
+
+def bench(label, command, cwd, runs, importtime):
+    walls, imports = [], {}
+    for _ in range(runs):
+        wall, stderr = run_once(command, cwd)
+        walls.append(wall)
+        if importtime:
+            for name, ms in parse_importtime(stderr).items():
+                imports.setdefault(name, []).append(ms)
+    result = {
+        "entry": label,
+        "kind": "source" if importtime else "frozen",
+        "runs": runs,
+        "wall_s": {
+            "min": round(min(walls), 4),
+            "median": round(statistics.median(walls), 4),
+            "max": round(max(walls), 4),
+        },
+    }
+    if importtime:
+        medians = {name: statistics.median(ms) for name, ms in imports.items()}
+        top = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:15]
+        result["imports_ms"] = {name: round(ms, 2) for name, ms in top}
+        result["imports_total_ms"] = round(sum(medians.values()), 2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entry", choices=["gui", "main", "both"], default="both")
+    parser.add_argument("--frozen", action="append", default=[], metavar="EXE",
+                        help="also time a PyInstaller build (repeatable)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    entries = ["gui.py", "main.py"] if args.entry == "both" else [f"{args.entry}.py"]
+    results = []
+    for script in entries:
+        command = [sys.executable, "-X", "importtime", script]
+        results.append(bench(script, command, HERE, args.runs, importtime=True))
+    for exe in args.frozen:
+        exe = os.path.abspath(exe)
+        results.append(bench(os.path.basename(exe), [exe], os.path.dirname(exe), args.runs, importtime=False))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
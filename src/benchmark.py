@@ -0,0 +1,256 @@
+"""Benchmarks for the habit models, storage and analytics.
+
+    python benchmark.py generate --habits 10000 --years 10 -o big.json
+    python benchmark.py run --habits 1000 --years 2 -o results.json
+    python benchmark.py run --data big.json -o results.json
+    python benchmark.py compare before.json after.json
+
+`run` writes machine-readable JSON (median/min seconds per benchmark) so
+results can be diffed between commits with `compare`.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import analytics
+import habit as habit_module
+from data_manager import DataManager
+from tracker import HabitTracker
+
+try:
+    from batch_analytics import BatchAnalytics, np
+except ImportError:
+    np = None
+
+
+# === Synthetic data ===
+def generate(path, habits, years, rate=0.8, seed=0):
+    """Write a data.json with `habits` habits and ~`rate` daily completions over `years` years."""
+    rng = random.Random(seed)
+    days = int(years * 365)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+    # Streamed habit by habit so the generator itself stays small at any scale
+    with open(path, 'w') as f:
+        f.write('{"seq": 0, "habits": [\n')
+        for i in range(habits):
+            periodicity = 'daily' if rng.random() < 0.8 else 'weekly'
+            step = 1 if periodicity == 'daily' else 7
+            completion_dt = [
+                (start + timedelta(days=d, seconds=rng.randrange(6 * 3600, 23 * 3600))).isoformat()
+                for d in range(0, days, step) if rng.random() < rate
+            ]
+            record = {
+                'name': f'habit-{i}',
+                'periodicity': periodicity,
+                'creation_dt': start.isoformat(),
+                'completion_dt': completion_dt
+            }
+            f.write(('' if i == 0 else ',\n') + json.dumps(record))
+        f.write('\n]}\n')
+
+
+# === Timing ===
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {'median_s': statistics.median(times), 'min_s': min(times), 'repeat': repeat}
+
+
+def bench_habit_model(path, repeat):
+    results = {}
+    results['DataManager.load_data'] = measure(DataManager.load_data, repeat)
+    results['DataManager.load_data(lazy)'] = measure(lambda: DataManager.load_data(lazy=True), repeat)
+
+    tracker = HabitTracker()
+    tracker.habits = DataManager.load_data()
+    habits = tracker.get_habits()
+    names = [h.name for h in habits]
+
+    results['Habit.get_streak (all habits)'] = measure(lambda: [h.get_streak() for h in habits], repeat)
+    results['habit.get_completion_rate (all habits)'] = measure(
+        lambda: [habit_module.get_completion_rate(h) for h in habits], repeat)
+
+    DataManager.FILE = path + '.out'
+    results['DataManager.save_data'] = measure(lambda: DataManager.save_data(habits), repeat)
+    results['DataManager save/load round trip'] = measure(
+        lambda: (DataManager.save_data(habits), DataManager.load_data()), repeat)
+    DataManager.FILE = path
+
+    results['HabitTracker.find_habit (all names)'] = measure(lambda: [tracker.find_habit(n) for n in names], repeat)
+
+    def delete_all():
+        t = HabitTracker()
+        t.habits = habits
+        for n in names:
+            t.delete_habit(n)
+    results['HabitTracker.delete_habit (all names)'] = measure(delete_all, repeat)
+
+    first = names[0] if names else ''
+    results['analytics.get_all_habits'] = measure(lambda: analytics.get_all_habits(tracker), repeat)
+    results['analytics.get_habits_by_periodicity'] = measure(
+        lambda: analytics.get_habits_by_periodicity(tracker, 'daily'), repeat)
+    results['analytics.get_longest_streak'] = measure(lambda: analytics.get_longest_streak(tracker), repeat)
+    results['analytics.get_longest_streak_for_habit'] = measure(
+        lambda: analytics.get_longest_streak_for_habit(tracker, first), repeat)
+    results['analytics.count_completions'] = measure(lambda: analytics.count_completions(tracker, first), repeat)
+    results['analytics.get_completion_rates'] = measure(lambda: analytics.get_completion_rates(tracker), repeat)
+    results['analytics.get_days_all_completed'] = measure(lambda: analytics.get_days_all_completed(tracker), repeat)
+    results['analytics.get_weekday_rates'] = measure(lambda: analytics.get_weekday_rates(tracker), repeat)
+    results['analytics.get_co_completion (first 50)'] = measure(
+        lambda: analytics.get_co_completion(tracker, names[:50]), repeat)
+
+    if np is not None:
+        results['BatchAnalytics build'] = measure(lambda: BatchAnalytics(habits), repeat)
+        engine = BatchAnalytics(habits)
+        results['analytics.get_habits_by_periodicity (engine)'] = measure(
+            lambda: analytics.get_habits_by_periodicity(tracker, 'daily', engine=engine), repeat)
+        results['analytics.get_longest_streak (engine incl. build)'] = measure(
+            lambda: analytics.get_longest_streak(tracker, engine=BatchAnalytics(habits)), repeat)
+        results['analytics.get_completion_rates (engine)'] = measure(
+            lambda: analytics.get_completion_rates(tracker, engine=engine), repeat)
+    return results
+
+
+def bench_main_model(path, repeat):
+    # main.py is self-contained but imports ttkbootstrap at module level
+    try:
+        import main as main_module
+    except ImportError as e:
+        return {'skipped': str(e)}
+    with open(path) as f:
+        data = json.load(f)
+    records = data['habits'] if isinstance(data, dict) else data
+
+    def build():
+        tracker = main_module.HabitTracker()
+        for d in records:
+            tracker.add_habit(d['name'], d['periodicity'])
+            h = tracker.find_habit(d['name'])
+            h.completion_dates = sorted({datetime.fromisoformat(ts).date() for ts in d['completion_dt']})
+        return tracker
+
+    results = {'main.HabitTracker build': measure(build, repeat)}
+    tracker = build()
+    habits = tracker.habits
+    names = [h.name for h in habits]
+    results['main.Habit.update_streak (all habits)'] = measure(lambda: [h.update_streak() for h in habits], repeat)
+    results['main.Habit.get_completion_rate (all habits)'] = measure(
+        lambda: [h.get_completion_rate() for h in habits], repeat)
+    results['main.HabitTracker.find_habit (all names)'] = measure(
+        lambda: [tracker.find_habit(n) for n in names], repeat)
+
+    def delete_all():
+        t = main_module.HabitTracker()
+        t.habits = habits
+        for n in names:
+            t.delete_habit(n)
+    results['main.HabitTracker.delete_habit (all names)'] = measure(delete_all, repeat)
+    results['main.Analytics.get_longest_streak'] = measure(
+        lambda: main_module.Analytics.get_longest_streak(tracker), repeat)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='habit-bench-')
+    # Keep every file DataManager touches (including the journal) inside the scratch dir
+    saved_paths = DataManager.FILE, DataManager.JOURNAL
+    DataManager.JOURNAL = os.path.join(workdir, 'data.journal')
+    try:
+        path = os.path.join(workdir, 'data.json')
+        DataManager.FILE = path
+        if args.data:
+            shutil.copy(args.data, path)
+        else:
+            generate(path, args.habits, args.years, seed=args.seed)
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'data': args.data or {'habits': args.habits, 'years': args.years, 'seed': args.seed},
+                'data_bytes': os.path.getsize(path),
+            },
+            'results': {},
+        }
+        report['results'].update(bench_habit_model(path, args.repeat))
+        report['results'].update(bench_main_model(path, args.repeat))
+    finally:
+        DataManager.FILE, DataManager.JOURNAL = saved_paths
+        shutil.rmtree(workdir, ignore_errors=True)
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+def compare(args):
+    with open(args.before) as f:
+        before = json.load(f)['results']
+    with open(args.after) as f:
+        after = json.load(f)['results']
+    for name in after:
+        if 'median_s' not in after[name]:
+            continue
+        if name in before and 'median_s' in before[name] and before[name]['median_s']:
+            ratio = after[name]['median_s'] / before[name]['median_s']
+            print(f"{name:55} {before[name]['median_s']:10.6f}s -> {after[name]['median_s']:10.6f}s  x{ratio:.2f}")
+        else:
+            print(f"{name:55} {'':>10}    -> {after[name]['median_s']:10.6f}s  (new)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='write a synthetic data.json')
+    gen.add_argument('--habits', type=int, default=10000)
+    gen.add_argument('--years', type=float, default=10)
+    gen.add_argument('--seed', type=int, default=0)
+    gen.add_argument('-o', '--output', required=True)
+
+    bench = sub.add_parser('run', help='run the benchmarks and write JSON results')
+    bench.add_argument('--habits', type=int, default=1000)
+    bench.add_argument('--years', type=float, default=2)
+    bench.add_argument('--seed', type=int, default=0)
+    bench.add_argument('--data', help='benchmark an existing data.json instead of generating one')
+    bench.add_argument('--repeat', type=int, default=5)
+    bench.add_argument('-o', '--output')
+
+    cmp = sub.add_parser('compare', help='compare two result files')
+    cmp.add_argument('before')
+    cmp.add_argument('after')
+
+    args = parser.parse_args(argv)
+    if args.command == 'generate':
+        generate(args.output, args.habits, args.years, seed=args.seed)
+    elif args.command == 'run':
+        run(args)
+    else:
+        compare(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+from datetime import date
+
+# Completion bitmaps are plain Python ints: bit i is set when day EPOCH + i was completed.
+# Python ints are arbitrary precision, so &, |, shifts and bit_count() run a machine word
+# at a time and one habit over 50 years is about 2.3 KB.
+EPOCH = date(1970, 1, 1).toordinal()
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(bits):
+        return bin(bits).count('1')
+
+def from_days(days):
+    # Bitmap of an iterable of day ordinals; days before EPOCH are left out
+    days = [d - EPOCH for d in days if d >= EPOCH]
+    if not days:
+        return 0
+    buf = bytearray(max(days) // 8 + 1)
+    for i in days:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+def to_days(bits):
+    # Day ordinals of the set bits, ascending
+    days = []
+    for i, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        while byte:
+            low = byte & -byte
+            days.append(EPOCH + i * 8 + low.bit_length() - 1)
+            byte ^= low
+    return days
+
+def window(start, end):
+    # Mask of the days in [start, end] (ordinals), clipped at EPOCH
+    start = max(start, EPOCH)
+    if end < start:
+        return 0
+    return ((1 << (end - start + 1)) - 1) << (start - EPOCH)
+
+def weekday_mask(weekday, end):
+    # Mask of every `weekday` (0 = Monday, like date.weekday()) from EPOCH up to `end`
+    n = end - EPOCH + 1
+    if n <= 0:
+        return 0
+    first = (weekday - date.fromordinal(EPOCH).weekday()) % 7
+    every_seventh = ((1 << (7 * (n // 7 + 1))) - 1) // 127  # bits 0, 7, 14, ...
+    return (every_seventh << first) & ((1 << n) - 1)
+
+def weekdays_between(weekday, start, end):
+    # How many `weekday`s fall in [start, end]
+    if end < start:
+        return 0
+    first = start + (weekday - date.fromordinal(start).weekday()) % 7
+    return (end - first) // 7 + 1 if first <= end else 0
@@ -0,0 +1,219 @@
+"""Binary columnar snapshot of habits, read through mmap.
+
+    python columnar.py to-bin data.json data.bin
+    python columnar.py to-json data.bin data.json
+
+Layout, little-endian:
+
+    header    magic, format version, habit count, journal seq, completion count,
+              habit table size
+    table     UTF-8 JSON list of [name, periodicity, creation_dt, timed, micro, exact]
+    offsets   int64 x (habits + 1), 8-byte aligned; habit i owns [offsets[i], offsets[i + 1])
+    days      int32 x completions, day ordinals in insertion order
+    secs      int32 x completions, seconds since midnight (-1 for a bare date)
+    micros    int32 x completions, microseconds
+
+`exact` lists [index, text] for timestamps the columns can't render back as
+written (UTC offsets, other ISO spellings), so conversion is lossless.
+Version 1 files, without micros and the last two table fields, still load.
+
+Columns are exposed as memoryviews into the mapping (or NumPy arrays with
+`arrays()`), so nothing is parsed on load; a Habit only copies its slice the
+first time its history is needed. A save releases the mapping before it
+replaces the file (see ColumnarSnapshot.release).
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+import threading
+from array import array
+
+from habit import Habit, NO_TIME, stored_periodicity
+
+MAGIC = b'HABITCOL'
+VERSION = 2
+HEADER = struct.Struct('<8sIIqQQ')
+LITTLE = sys.byteorder == 'little'
+
+
+def _align(pos):
+    return (pos + 7) & ~7
+
+
+def _le(column):
+    if not LITTLE:
+        column = column[:]
+        column.byteswap()
+    return column
+
+
+def _copy(view):
+    # Owned int32 copy of a column slice
+    column = array('i')
+    column.frombytes(view.cast('B'))
+    return column
+
+
+def is_columnar(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def read_seq(path):
+    # Journal seq from the header alone
+    with open(path, 'rb') as f:
+        return HEADER.unpack(f.read(HEADER.size))[3]
+
+
+def write(f, habits, seq=0):
+    """Write `habits` to the binary file object `f`."""
+    columns = [h.event_columns() for h in habits]
+    table = json.dumps([[h.name, h.periodicity, h.creation_dt, secs is not None, micros is not None,
+                         sorted(exact.items()) if exact else []]
+                        for h, (days, secs, micros, exact) in zip(habits, columns)]).encode()
+    offsets = array('q', [0])
+    for days, *_ in columns:
+        offsets.append(offsets[-1] + len(days))
+    f.write(HEADER.pack(MAGIC, VERSION, len(habits), seq, offsets[-1], len(table)))
+    f.write(table)
+    f.write(b'\0' * (_align(HEADER.size + len(table)) - HEADER.size - len(table)))
+    f.write(_le(offsets).tobytes())
+    for days, *_ in columns:
+        f.write(_le(days).tobytes())
+    for days, secs, _, _ in columns:
+        f.write(_le(secs).tobytes() if secs is not None else (array('i', [NO_TIME]) * len(days)).tobytes())
+    for days, _, micros, _ in columns:
+        f.write(_le(micros).tobytes() if micros is not None else bytes(4 * len(days)))
+
+
+class ColumnarSnapshot:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._lock = threading.Lock()
+        magic, version, count, self.seq, events, table_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"{path} is not a version {VERSION} habit snapshot")
+        pos = HEADER.size
+        self.table = json.loads(self._map[pos:pos + table_size])
+        pos = _align(pos + table_size)
+        self._offsets_at = pos
+        self._days_at = pos + 8 * (count + 1)
+        self._secs_at = self._days_at + 4 * events
+        self._micros_at = self._secs_at + 4 * events if version > 1 else None
+        if self._secs_at + 4 * events * (2 if version > 1 else 1) > len(self._map):
+            raise ValueError(f"{path} is truncated")
+        self._count, self._events = count, events
+        self._views()
+
+    def _views(self):
+        view = self._view = memoryview(self._map)
+        self.offsets = self._column(view, self._offsets_at, self._count + 1, 'q')
+        self.days = self._column(view, self._days_at, self._events, 'i')
+        self.secs = self._column(view, self._secs_at, self._events, 'i')
+        self.micros = self._column(view, self._micros_at, self._events, 'i') if self._micros_at else None
+
+    def release(self):
+        """Swap the mapping for an in-memory copy and close it.
+
+        Windows refuses to replace a file that is still mapped, so a save
+        calls this before renaming over the snapshot; lazy habits keep
+        loading from the copy. Live NumPy views from arrays() keep the map
+        open until they are gone.
+        """
+        with self._lock:
+            mapping = self._map
+            if not isinstance(mapping, mmap.mmap):
+                return
+            self._map = mapping[:]
+            for view in (self.offsets, self.days, self.secs, self.micros, self._view):
+                if view is not None:
+                    view.release()
+            self._views()
+            try:
+                mapping.close()
+            except BufferError:
+                pass
+
+    @staticmethod
+    def _column(view, pos, n, typecode):
+        size = array(typecode).itemsize
+        column = view[pos:pos + n * size].cast(typecode)
+        if LITTLE:
+            return column
+        column = array(typecode, column.tobytes())  # big-endian hosts get a swapped copy
+        column.byteswap()
+        return memoryview(column)
+
+    def __len__(self):
+        return len(self.table)
+
+    def columns(self, i):
+        # Zero-copy (days, secs, micros) views of habit i, None where it has no times or
+        # fractions, plus its {index: text} of exactly kept timestamps
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        entry = self.table[i]
+        micro = len(entry) > 4 and entry[4]
+        exact = {j: text for j, text in entry[5]} if len(entry) > 5 and entry[5] else None
+        return (self.days[lo:hi], self.secs[lo:hi] if entry[3] else None,
+                self.micros[lo:hi] if micro else None, exact)
+
+    def copy_columns(self, i):
+        # Same as columns() but copied out under the lock, so release() never closes the
+        # map under a slice a habit is still reading
+        with self._lock:
+            days, secs, micros, exact = self.columns(i)
+            return (_copy(days), _copy(secs) if secs is not None else None,
+                    _copy(micros) if micros is not None else None, exact)
+
+    def arrays(self):
+        # NumPy views (offsets, days, secs) over the whole columns
+        import numpy as np
+        return (np.frombuffer(self._map, '<i8', len(self.offsets), self._offsets_at),
+                np.frombuffer(self._map, '<i4', len(self.days), self._days_at),
+                np.frombuffer(self._map, '<i4', len(self.secs), self._secs_at))
+
+    def habits(self, lazy=True):
+        habits = []
+        for i, (name, periodicity, creation_dt, *_) in enumerate(self.table):
+            habit = Habit(name, stored_periodicity(name, periodicity), creation_dt,
+                          lambda i=i: self.copy_columns(i), lazy=True)
+            if not lazy:
+                habit.event_columns()
+            habits.append(habit)
+        return habits
+
+
+def json_to_columnar(src, dst):
+    with open(src) as f:
+        data = json.load(f)
+    records, seq = (data['habits'], data.get('seq', 0)) if isinstance(data, dict) else (data, 0)
+    with open(dst, 'wb') as f:
+        write(f, [Habit.from_dict(d) for d in records], seq)
+
+
+def columnar_to_json(src, dst):
+    snapshot = ColumnarSnapshot(src)
+    with open(dst, 'w') as f:
+        json.dump({'seq': snapshot.seq, 'habits': [h.to_dict() for h in snapshot.habits()]}, f, indent=4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['to-bin', 'to-json'])
+    parser.add_argument('source')
+    parser.add_argument('target')
+    args = parser.parse_args(argv)
+    if args.command == 'to-bin':
+        json_to_columnar(args.source, args.target)
+    else:
+        columnar_to_json(args.source, args.target)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,529 @@
 import json
-from habit import Habit
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+import columnar
+from habit import Habit, stored_periodicity
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+_decoder = json.JSONDecoder()
+
+class _JsonStream:
+    # Minimal pull parser: decodes one JSON value at a time from a file read in chunks,
+    # so a large file is never held as text and as parsed objects at the same time
+    def __init__(self, f, chunk=1 << 20):
+        self.f = f
+        self.chunk = chunk
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self, size=None):
+        data = self.f.read(size or self.chunk)
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return bool(data)
+
+    def peek(self):
+        # Next non-whitespace character, or '' at end of file
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def take(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in {self.f.name}")
+        self.pos += 1
+
+    def value(self, raw=False):
+        # raw=True returns (value, source text)
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Value runs past the buffer; grow geometrically so big values stay linear
+                if not self._fill(max(self.chunk, len(self.buf))):
+                    raise
+                continue
+            if end == len(self.buf) and self._fill():
+                continue  # a number may have been cut at the chunk boundary
+            start, self.pos = self.pos, end
+            return (value, self.buf[start:end]) if raw else value
+
+    def items(self, raw=False):
+        # Yield the elements of the array at the current position one by one
+        self.take('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value(raw)
+            if self.peek() == ']':
+                self.pos += 1
+                return
+            self.take(',')
+
+class _FileLock:
+    # Advisory exclusive lock on a side file, taken by every process using the same data file
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+
+    def __enter__(self):
+        self.f = open(self.path, 'a+b')
+        if os.name == 'nt':
+            self.f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after about 10 s; keep waiting
+        else:
+            fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if os.name == 'nt':
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
 
 class DataManager:
-    FILE = 'data.json'
+    # HABIT_BINARY=1 saves snapshots in the mmap-able columnar format (see columnar.py);
+    # either format is recognised on load
+    binary = os.environ.get('HABIT_BINARY') == '1'
+
+    FILE = 'data.bin' if binary else 'data.json'
+    JOURNAL = 'data.journal'
+    COMPACT_BYTES = 1 << 20  # compact once the journal grows past this size
+
+    # Journal mode appends one record per mutation instead of rewriting FILE
+    journal_mode = os.environ.get('HABIT_JOURNAL') == '1'
+
+    # Every commit (snapshot or journal event) gets a new, higher seq across all processes,
+    # so the highest seq on disk is the data's version stamp.
+    _lock = threading.Lock()
+    _seq = 0        # version stamp of the data our habits in memory reflect
+    _base = {}      # name -> (habit version, completion count, generation) as of our last load or save
+    _encoded = {}   # name -> (habit version, JSON text) from the last save
+    _mapped = weakref.WeakSet()  # binary snapshots lazy habits still load from
+
+    @staticmethod
+    @contextmanager
+    def _locked():
+        # Threads of this process first, then other processes
+        with DataManager._lock, _FileLock(DataManager.FILE + '.lock'):
+            yield
 
     @staticmethod
     def save_data(habits):
-        with open(DataManager.FILE, 'w') as f:
-            json.dump(
-                [habit.__dict__ for habit in habits],
-                f,
-                indent=4
-            )
+        # If another process committed since our last load, its changes are merged per
+        # habit instead of being overwritten. Merged-in changes are not in memory, so saves
+        # keep merging until the next load.
+        habits = list(habits)
+        with DataManager._locked():
+            disk_seq = DataManager._disk_seq()
+            in_sync = disk_seq == DataManager._seq
+            entries = habits if in_sync else DataManager._merge(habits)
+            seq = max(disk_seq, DataManager._seq) + 1
+            if DataManager.binary:
+                DataManager._write_columnar([DataManager._as_habit(e) for e in entries], seq)
+            else:
+                DataManager._encoded = DataManager._write_snapshot(entries, seq)
+            # Everything on disk is in the snapshot now, so the journal can go
+            for path in (DataManager.JOURNAL, DataManager._old_journal()):
+                if os.path.exists(path):
+                    os.remove(path)
+            if in_sync:
+                DataManager._seq = seq
+            DataManager._base = DataManager._base_of(habits)
+
+    @staticmethod
+    def load_data(lazy=False):
+        # lazy=True only parses habit headers; each history is parsed on first use
+        habits, seq = DataManager._read_habits(lazy)
+        DataManager._seq = seq
+        DataManager._base = DataManager._base_of(habits)
+        return habits
+
+    @staticmethod
+    def read_data(lazy=False):
+        # load_data for readers that never save (reports): opens nothing for writing, not even
+        # the lock file, and leaves the merge state of this process alone
+        return DataManager._read_habits(lazy)[0]
+
+    @staticmethod
+    def _read_habits(lazy):
+        while True:
+            if columnar.is_columnar(DataManager.FILE):
+                habits, snapshot_seq = DataManager._read_columnar(lazy)
+                seq = DataManager._replay_habits(habits, DataManager._old_journal(), snapshot_seq)
+                seq = DataManager._replay_habits(habits, DataManager.JOURNAL, seq)
+                habits = list(habits.values())
+            else:
+                records, snapshot_seq = DataManager._read_snapshot()
+                seq = DataManager._replay(records, DataManager._old_journal(), snapshot_seq)
+                seq = DataManager._replay(records, DataManager.JOURNAL, seq)
+                habits = [Habit.from_dict(d, lazy=lazy) for d in records.values()]
+            # A save or compaction elsewhere may have folded the journals while we read; read again
+            if DataManager._snapshot_seq_on_disk() == snapshot_seq:
+                return habits, seq
+
+    @staticmethod
+    def append_event(op, **fields):
+        # op is one of 'add', 'complete', 'delete', 'reset'
+        DataManager.append_events([dict(fields, op=op)])
+
+    @staticmethod
+    def append_events(events):
+        # Several events as dicts with an 'op' key, written and fsync'd together
+        with DataManager._locked():
+            disk_seq = DataManager._disk_seq()
+            seq = max(disk_seq, DataManager._seq)
+            lines = []
+            for event in events:
+                seq += 1
+                lines.append(json.dumps({'seq': seq, **event}) + '\n')
+            DataManager._repair_tail(DataManager.JOURNAL)
+            with open(DataManager.JOURNAL, 'a') as f:
+                f.write(''.join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            # Only move our stamp on if nobody else had committed, or a later save would skip their changes
+            if disk_seq == DataManager._seq:
+                DataManager._seq = seq
+        if size > DataManager.COMPACT_BYTES:
+            DataManager.compact()
+
+    @staticmethod
+    def compact():
+        # Rotate the journal so new appends go to a fresh file, then fold the
+        # rotated part into the snapshot on a background thread.
+        with DataManager._locked():
+            old = DataManager._old_journal()
+            if not os.path.exists(old):
+                if not os.path.exists(DataManager.JOURNAL):
+                    return None
+                os.replace(DataManager.JOURNAL, old)
+        thread = threading.Thread(target=DataManager._fold_old_journal, daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _fold_old_journal():
+        # Read and replay without holding the locks, then commit only if nobody
+        # rewrote the snapshot meanwhile (a save folds the journal itself)
+        old = DataManager._old_journal()
+        while os.path.exists(old):
+            if columnar.is_columnar(DataManager.FILE):
+                habits, snapshot_seq = DataManager._read_columnar()
+                seq = DataManager._replay_habits(habits, old, snapshot_seq)
+                write = lambda: DataManager._write_columnar(list(habits.values()), seq)
+            else:
+                records, snapshot_seq = DataManager._read_snapshot()
+                seq = DataManager._replay(records, old, snapshot_seq)
+                write = lambda: DataManager._write_snapshot(list(records.values()), seq)
+            with DataManager._locked():
+                if not os.path.exists(old):
+                    return
+                if DataManager._snapshot_seq_on_disk() == snapshot_seq:
+                    write()
+                    os.remove(old)
+                    return
+
+    @staticmethod
+    def _old_journal():
+        return DataManager.JOURNAL + '.old'
+
+    # === Version stamps and merging ===
+    @staticmethod
+    def _disk_seq():
+        return max(DataManager._snapshot_seq_on_disk(),
+                   DataManager._tail_seq(DataManager._old_journal()),
+                   DataManager._tail_seq(DataManager.JOURNAL))
+
+    @staticmethod
+    def _snapshot_seq_on_disk():
+        if columnar.is_columnar(DataManager.FILE):
+            return columnar.read_seq(DataManager.FILE)
+        try:
+            f = open(DataManager.FILE, 'r')
+        except FileNotFoundError:
+            return 0
+        with f:
+            # seq is written before habits, so this only reads the head of the file
+            stream = _JsonStream(f, chunk=4096)
+            if stream.peek() != '{':
+                return 0
+            stream.take('{')
+            while stream.peek() == '"':
+                key = stream.value()
+                stream.take(':')
+                if key != 'seq':
+                    return 0
+                return stream.value()
+        return 0
+
+    @staticmethod
+    def _tail_seq(path):
+        # seq of the last complete journal line, reading only the end of the file
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - 65536))
+            lines = f.read().split(b'\n')
+        for line in reversed(lines[:-1]):
+            try:
+                return json.loads(line)['seq']
+            except (ValueError, KeyError):
+                continue
+        return 0
+
+    @staticmethod
+    def _merge(habits):
+        # Three-way merge with what is on disk; _base tells which side changed each habit
+        theirs, texts = DataManager._read_state()
+        base = DataManager._base
+        entries = []
+        ours = set()
+        for habit in habits:
+            name = habit.name
+            ours.add(name)
+            b, t = base.get(name), theirs.get(name)
+            if b is not None and habit.version == b[0]:
+                # Unchanged here: their copy wins, including a delete
+                if t is not None:
+                    entries.append(texts.get(name) or t)
+            elif t is None or (b is not None and habit.generation != b[2]):
+                # Added here, deleted elsewhere but changed here, or history replaced here
+                # (a reset, or deleted and added again)
+                entries.append(habit)
+            else:
+                # Completed on both sides: theirs plus ours since the base
+                known = set(t['completion_dt'])
+                added = habit.completion_dt[b[1] if b is not None else 0:]
+                t['completion_dt'] += [dt for dt in added if dt not in known]
+                entries.append(t)
+        for name, t in theirs.items():
+            if name not in ours and name not in base:
+                entries.append(texts.get(name) or t)  # added elsewhere
+        return entries
+
+    @staticmethod
+    def _base_of(habits):
+        return {habit.name: (habit.version, habit.event_count(), habit.generation) for habit in habits}
+
+    @staticmethod
+    def _read_state():
+        # Snapshot plus journals as raw dicts, and the source text of those no journal event touched
+        if columnar.is_columnar(DataManager.FILE):
+            habits, seq = DataManager._read_columnar()
+            records, texts = {name: habit.to_dict() for name, habit in habits.items()}, {}
+        else:
+            records, seq, texts = DataManager._read_snapshot(raw=True)
+        touched = set()
+        seq = DataManager._replay(records, DataManager._old_journal(), seq, touched)
+        DataManager._replay(records, DataManager.JOURNAL, seq, touched)
+        for name in touched:
+            texts.pop(name, None)
+        return records, texts
+
+    @staticmethod
+    def _as_habit(entry):
+        if isinstance(entry, Habit):
+            return entry
+        return Habit.from_dict(json.loads(entry) if isinstance(entry, str) else entry)
+
+    # === Snapshot files ===
+    @staticmethod
+    def _read_snapshot(raw=False):
+        # raw=True also returns each habit's source text, keyed by name
+        records, seq, texts = {}, 0, {}
+        try:
+            f = open(DataManager.FILE, 'r')
+        except FileNotFoundError:
+            return (records, seq, texts) if raw else (records, seq)
+        with f:
+            stream = _JsonStream(f)
+            if stream.peek() == '[':  # files written before the journal existed
+                habits = stream.items(raw)
+            else:
+                stream.take('{')
+                habits = ()
+                while stream.peek() != '}':
+                    key = stream.value()
+                    stream.take(':')
+                    if key == 'habits':
+                        habits = stream.items(raw)
+                        break
+                    value = stream.value()
+                    if key == 'seq':
+                        seq = value
+                    if stream.peek() == ',':
+                        stream.pos += 1
+            for item in habits:
+                if raw:
+                    d, texts[item[0]['name']] = item
+                else:
+                    d = item
+                first = records.setdefault(d['name'], d)
+                if first is not d:
+                    # A name repeated in an older file: keep one record with both histories
+                    known = set(first['completion_dt'])
+                    first['completion_dt'] += [dt for dt in d['completion_dt'] if dt not in known]
+                    texts.pop(d['name'], None)
+        return (records, seq, texts) if raw else (records, seq)
+
+    @staticmethod
+    def _read_columnar(lazy=True):
+        # Habits wrap their slice of the mapped file and copy it out on first use
+        snapshot = columnar.ColumnarSnapshot(DataManager.FILE)
+        DataManager._mapped.add(snapshot)
+        habits = {}
+        for habit in snapshot.habits(lazy):
+            first = habits.setdefault(habit.name, habit)
+            if first is not habit:
+                known = set(first.completion_dt)
+                first.extend_completions([dt for dt in habit.completion_dt if dt not in known])
+        return habits, snapshot.seq
+
+    @staticmethod
+    def _write_columnar(habits, seq):
+        tmp = DataManager.FILE + '.tmp'
+        with open(tmp, 'wb') as f:
+            columnar.write(f, habits, seq)
+            f.flush()
+            os.fsync(f.fileno())
+        for snapshot in list(DataManager._mapped):
+            snapshot.release()  # a mapped file can't be replaced on Windows
+        DataManager._mapped.clear()
+        os.replace(tmp, DataManager.FILE)
+
+    @staticmethod
+    def _write_snapshot(entries, seq):
+        # entries are Habits, raw dicts or already-encoded JSON text. A Habit whose version
+        # matches the last save reuses that text; returns the texts of the Habits written.
+        encoded = {}
+        tmp = DataManager.FILE + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(f'{{"seq": {seq}, "habits": [')
+            for i, entry in enumerate(entries):
+                if isinstance(entry, Habit):
+                    cached = DataManager._encoded.get(entry.name)
+                    text = cached[1] if cached and cached[0] == entry.version else json.dumps(entry.to_dict(), indent=4)
+                    encoded[entry.name] = (entry.version, text)
+                else:
+                    text = entry if isinstance(entry, str) else json.dumps(entry, indent=4)
+                f.write(('\n' if i == 0 else ',\n') + text)
+            f.write('\n]}\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, DataManager.FILE)
+        return encoded
+
+    @staticmethod
+    def _replay(records, path, seq, touched=None):
+        # Apply journal events newer than seq to raw habit dicts; names they change go in touched
+        for event in DataManager._events(path, seq):
+            seq = event['seq']
+            op = event['op']
+            if touched is not None:
+                touched.update(records if op == 'reset' else (event['name'],))
+            if op == 'add':
+                if event['name'] not in records:
+                    records[event['name']] = {
+                        'name': event['name'],
+                        'periodicity': event['periodicity'],
+                        'creation_dt': event['creation_dt'],
+                        'completion_dt': []
+                    }
+            elif op == 'complete':
+                if event['name'] in records:
+                    records[event['name']]['completion_dt'].append(event['ts'])
+            elif op == 'delete':
+                records.pop(event['name'], None)
+            elif op == 'reset':
+                for d in records.values():
+                    d['completion_dt'] = []
+        return seq
+
+    @staticmethod
+    def _replay_habits(habits, path, seq):
+        # Same as _replay, on Habit objects loaded from a binary snapshot
+        for event in DataManager._events(path, seq):
+            seq = event['seq']
+            op = event['op']
+            if op == 'add':
+                if event['name'] not in habits:
+                    habits[event['name']] = Habit(event['name'], stored_periodicity(event['name'], event['periodicity']),
+                                                  event['creation_dt'])
+            elif op == 'complete':
+                if event['name'] in habits:
+                    habits[event['name']].extend_completions([event['ts']])
+            elif op == 'delete':
+                habits.pop(event['name'], None)
+            elif op == 'reset':
+                for habit in habits.values():
+                    habit.completion_dt = []
+        return seq
+
+    @staticmethod
+    def _events(path, seq):
+        # Read-only, so it is safe without the locks: a line with no newline yet is either
+        # being appended right now or a crash remnant, and stops the read either way
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    return
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # a damaged line doesn't hide the events after it
+                if event['seq'] > seq:
+                    yield event
 
     @staticmethod
-    def load_data():
+    def _repair_tail(path):
+        # Under the locks nobody else is appending, so a last line without a newline is
+        # a torn write from a crash; cut it so the next append starts on a fresh line
         try:
-            with open(DataManager.FILE, 'r') as f:
-                data = json.load(f)
-                return [Habit(
-                    name=d['name'],
-                    periodicity=d['periodicity'],
-                    creation_dt=d['creation_dt'],
-                    completion_dt=d['completion_dt']
-                ) for d in data]
+            f = open(path, 'rb+')
         except FileNotFoundError:
-            return []
+            return
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            pos = size
+            while pos > 0:
+                start = max(0, pos - 65536)
+                f.seek(start)
+                newline = f.read(pos - start).rfind(b'\n')
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    return
+                pos = start
+            f.truncate(0)
@@ -1,14 +1,51 @@
+import os
+import time
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, ttk
 from tracker import HabitTracker
 from data_manager import DataManager
 import analytics
-from datetime import datetime
-from PIL import Image, ImageTk
+import analytics_cache
+import instrument
+from views import PagedTree, TrackerWatch
+from persister import WriteBehindPersister
+from jobs import AnalyticsRunner
+from scheduler import Scheduler, DUE, OVERDUE, UPCOMING
+from datetime import date, datetime, timedelta
+
+# Modal dialogs wait on the user, so instrumented handlers leave them out
+askyesno, showerror, showinfo = map(instrument.untimed, (messagebox.askyesno, messagebox.showerror, messagebox.showinfo))
+
+LOGO = "logo.png"
+LOGO_CACHE = "logo_120.png"
+
+def load_logo(size=120):
+    # Tk reads PNG natively, so PIL is only imported when the resized copy is stale
+    if not os.path.exists(LOGO_CACHE) or (
+            os.path.exists(LOGO) and os.path.getmtime(LOGO_CACHE) < os.path.getmtime(LOGO)):
+        from PIL import Image
+        Image.open(LOGO).resize((size, size)).save(LOGO_CACHE)
+    return tk.PhotoImage(file=LOGO_CACHE)
 
 def main():
+    instrument.install()
+
+    # HABIT_SQLITE=1 switches storage to data.db and lets analytics query it directly
+    sql_store = None
+    if os.environ.get("HABIT_SQLITE") == "1":
+        from sqlite_manager import SqliteDataManager
+        sql_store = SqliteDataManager
+    store = sql_store or DataManager
+
     tracker = HabitTracker()
-    tracker.habits = DataManager.load_data()
+    tracker.habits = store.load_data(lazy=True)
+
+    def persist(op, **fields):
+        # Journal mode appends the single mutation; otherwise queue a background rewrite
+        if store.journal_mode:
+            store.append_event(op, **fields)
+        else:
+            persister.schedule()
 
     # === Theme Colors & Fonts ===
     bg = "#EEF4FB"
@@ -43,6 +80,67 @@ def main():
     except:
         pass
 
+    # === Background Saving ===
+    persister = WriteBehindPersister(
+        root,
+        snapshot=lambda: [h.copy() for h in tracker.get_habits()],
+        save=store.save_data,
+        on_error=lambda e: showerror("Save failed", f"Could not save habits: {e}")
+    )
+
+    # === Background Analytics ===
+    runner = AnalyticsRunner(
+        root, tracker,
+        on_error=lambda e: showerror("Analysis failed", f"Could not analyze habits: {e}")
+    )
+
+    def run_in_background(title, analysis, on_done, **kwargs):
+        # A progress window with a Cancel button appears if the job takes more than a moment
+        widgets = {}
+
+        def open_progress():
+            if not job.running:
+                return
+            win = tk.Toplevel(root, bg=bg)
+            win.title(title)
+            tk.Label(win, text=f"{title}…", font=font_subheading, bg=bg, fg=text_dark).pack(pady=10, padx=20)
+            bar = ttk.Progressbar(win, length=260, mode="determinate")
+            bar.pack(padx=20, pady=5)
+            tk.Button(win, text="Cancel", command=cancel, **button_style).pack(pady=10)
+            win.protocol("WM_DELETE_WINDOW", cancel)
+            widgets.update(win=win, bar=bar)
+
+        def progress(done, total):
+            if "bar" in widgets:
+                widgets["bar"].config(maximum=max(total, 1), value=done)
+
+        def close():
+            if "win" in widgets:
+                widgets.pop("win").destroy()
+                widgets.clear()
+
+        def finish(result):
+            close()
+            on_done(result)
+
+        def cancel():
+            job.cancel()
+            close()
+
+        job = runner.submit(analysis, finish, progress, **kwargs)
+        root.after(150, open_progress)
+        return job
+
+    def on_close():
+        runner.shutdown()
+        try:
+            persister.flush()
+        except Exception as e:
+            showerror("Save failed", f"Could not save habits: {e}")
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
     # === Scrollable Canvas ===
     canvas = tk.Canvas(root, bg=bg, highlightthickness=0)
     canvas.pack(side="top", fill="both", expand=True)
@@ -75,9 +173,7 @@ def main():
     # === Title and Logo ===
     tk.Label(main_frame, text="Habit Tracker", font=font_heading, bg=bg, fg=text_dark).pack(pady=(20, 5))
     try:
-        img = Image.open("logo.png")
-        img = img.resize((120, 120))
-        root.logo_img = ImageTk.PhotoImage(img)
+        root.logo_img = load_logo()
         tk.Label(main_frame, image=root.logo_img, bg=bg).pack(pady=(0, 20))
     except:
         pass
@@ -111,33 +207,40 @@ def main():
         name = name_entry.get().strip()
         periodicity = freq_var.get()
         if not name or periodicity not in ["daily", "weekly"]:
-            messagebox.showerror("Error", "Please enter name and frequency.")
+            showerror("Error", "Please enter name and frequency.")
             return
-        tracker.add_habit(name, periodicity)
-        DataManager.save_data(tracker.get_habits())
-        messagebox.showinfo("Success", f"Added '{name}' as {periodicity}.")
+        if not tracker.add_habit(name, periodicity):
+            showerror("Error", f"Habit '{name}' already exists.")
+            return
+        habit = tracker.find_habit(name)
+        persist('add', name=name, periodicity=periodicity, creation_dt=habit.creation_dt)
+        showinfo("Success", f"Added '{name}' as {periodicity}.")
         name_entry.delete(0, tk.END)
         freq_var.set("")
         select_freq("")
 
-    tk.Button(card, text="Add ➕", command=add_habit, **button_style).grid(row=4, column=0, columnspan=2, pady=15)
+    tk.Button(card, text="Add ➕", command=instrument.timed("gui.add_habit")(add_habit), **button_style).grid(row=4, column=0, columnspan=2, pady=15)
 
     # === Functional Buttons ===
     def show_habits():
         habits = tracker.get_habits()
         if not habits:
-            messagebox.showinfo("No habits", "You have no habits yet.")
+            showinfo("No habits", "You have no habits yet.")
             return
         win = tk.Toplevel(root, bg=bg)
         win.title("Your Habits")
-        for h in habits:
-            text = f"{h.name} ({h.periodicity}) — Streak: {h.get_streak()}"
-            tk.Label(win, text=text, font=font_main, bg=bg, fg=text_dark).pack(anchor="w", padx=20, pady=4)
+        view = PagedTree(win, columns=("periodicity", "streak"), headings=("Periodicity", "Streak"),
+                         tree_heading="Habit", font=font_main)
+        view.pack(fill="both", expand=True, padx=20, pady=10)
+        render = lambda h: (h.name, (h.periodicity, analytics_cache.streak(h)), None)
+        view.set_rows(habits, render)
+        TrackerWatch(win, tracker, lambda changes: view.apply(changes) if changes is not None
+                     else view.set_rows(tracker.get_habits(), render))
 
     def complete_habit():
         habits = tracker.get_habits()
         if not habits:
-            messagebox.showinfo("No habits", "Nothing to complete.")
+            showinfo("No habits", "Nothing to complete.")
             return
         win = tk.Toplevel(root, bg=bg)
         win.title("Complete Habit")
@@ -145,24 +248,37 @@ def main():
         tk.Label(win, text="Select a habit", font=font_subheading, bg=bg, fg=text_dark).pack(pady=10)
         tk.OptionMenu(win, selected, *[h.name for h in habits]).pack(pady=5)
         def mark():
-            tracker.find_habit(selected.get()).mark_completed()
-            DataManager.save_data(tracker.get_habits())
-            messagebox.showinfo("Done", f"Marked '{selected.get()}' as complete.")
+            habit = tracker.find_habit(selected.get())
+            habit.mark_completed()
+            persist('complete', name=habit.name, ts=habit.completion_dt[-1])
+            showinfo("Done", f"Marked '{selected.get()}' as complete.")
             win.destroy()
-        tk.Button(win, text="Mark Completed", command=mark, **button_style).pack(pady=10)
+        tk.Button(win, text="Mark Completed", command=instrument.timed("gui.mark")(mark), **button_style).pack(pady=10)
 
     def analyze_habits():
-        longest = analytics.get_longest_streak(tracker)
-        if longest:
-            s = longest.get_streak()
-            messagebox.showinfo("Longest Streak", f"🌟 '{longest.name}' — {s} days")
+        def show(habit):
+            if habit:
+                showinfo("Longest Streak", f"🌟 '{habit.name}' — {analytics_cache.streak(habit)} days")
+            else:
+                showinfo("No streaks", "No data to analyze.")
+
+        def done(longest):
+            # The winner comes from a snapshot; cache and report the live habit. The runner only
+            # reports results for the current tracker version, so it is cached under that
+            habit = tracker.find_habit(longest.name) if longest else None
+            analytics_cache.remember('top', tracker, sql_store, habit)
+            show(habit)
+
+        found, habit = analytics_cache.lookup('top', tracker, sql_store)
+        if found:
+            show(habit)
         else:
-            messagebox.showinfo("No streaks", "No data to analyze.")
+            run_in_background("Analyzing", analytics.iter_longest_streak, done, store=sql_store)
 
     def delete_habit():
         habits = tracker.get_habits()
         if not habits:
-            messagebox.showinfo("No habits", "Nothing to delete.")
+            showinfo("No habits", "Nothing to delete.")
             return
         win = tk.Toplevel(root, bg=bg)
         win.title("Delete Habit")
@@ -171,48 +287,177 @@ def main():
         tk.OptionMenu(win, selected, *[h.name for h in habits]).pack(pady=5)
         def delete():
             tracker.delete_habit(selected.get())
-            DataManager.save_data(tracker.get_habits())
-            messagebox.showinfo("Deleted", f"Habit '{selected.get()}' removed.")
+            persist('delete', name=selected.get())
+            showinfo("Deleted", f"Habit '{selected.get()}' removed.")
             win.destroy()
-        tk.Button(win, text="Delete", command=delete, **button_style).pack(pady=10)
+        tk.Button(win, text="Delete", command=instrument.timed("gui.delete")(delete), **button_style).pack(pady=10)
 
     def reset_streaks():
-        if messagebox.askyesno("Reset All", "Reset all streaks?"):
+        if askyesno("Reset All", "Reset all streaks?"):
             for h in tracker.get_habits():
                 h.completion_dt = []
-            DataManager.save_data(tracker.get_habits())
-            messagebox.showinfo("Reset", "Streaks reset.")
+            persist('reset')
+            showinfo("Reset", "Streaks reset.")
 
     def view_history():
         habits = tracker.get_habits()
         if not habits:
-            messagebox.showinfo("Empty", "No habits available.")
+            showinfo("Empty", "No habits available.")
             return
         win = tk.Toplevel(root, bg=bg)
         win.title("History")
-        for h in habits:
-            tk.Label(win, text=h.name, font=font_subheading, bg=bg, fg=text_dark).pack(anchor="w", padx=20, pady=(10, 0))
-            if h.completion_dt:
-                for dt in h.completion_dt:
-                    tk.Label(win, text=f"• {dt}", font=font_main, bg=bg, fg=text_dark).pack(anchor="w", padx=40)
-            else:
-                tk.Label(win, text="• No completions", font=font_main, bg=bg, fg="#888").pack(anchor="w", padx=40)
+        # One collapsed section per habit; timestamps are only rendered a page at a time once expanded
+        view = PagedTree(win, columns=("count",), headings=("Completions",), tree_heading="Habit", font=font_main)
+        view.pack(fill="both", expand=True, padx=20, pady=10)
+        render = lambda h: (h.name, (len(h.completion_dt) or "No completions",), h.completion_dt)
+        child_render = lambda dt: (f"• {dt}", (), None)
+        view.set_rows(habits, render, child_render)
+        TrackerWatch(win, tracker, lambda changes: view.apply(changes) if changes is not None
+                     else view.set_rows(tracker.get_habits(), render, child_render))
 
     def view_completion_rate():
+        if not tracker.get_habits():
+            showinfo("No habits", "Nothing to analyze.")
+            return
+
+        def describe(h, rate):
+            today = date.today()
+            total = (today - datetime.fromisoformat(h.creation_dt).date()).days + 1
+            recent = h.completion_rate(today - timedelta(days=29), today)
+            return f"{h.name}: {rate}% ({h.count_completions()}/{total} days), last 30 days {recent}%"
+
+        def summaries(snapshot):
+            # Runs on a worker over a snapshot: the label text of every habit, a chunk at a time
+            rates = sql_store.completion_rates() if sql_store else {}
+            yield from analytics.iter_per_habit(
+                snapshot, lambda h: describe(h, rates.get(h.name) or analytics.habit_completion_rate(h)))
+
+        def show(texts):
+            win = tk.Toplevel(root, bg=bg)
+            win.title("Completion Rates")
+            labels = {}
+
+            def add_label(h, text):
+                labels[h] = tk.Label(win, text=text, font=font_main, bg=bg, fg=text_dark)
+                labels[h].pack(anchor="w", padx=20, pady=4)
+
+            def apply(changes):
+                # Only the labels of habits that changed are touched
+                if changes is None:
+                    for label in labels.values():
+                        label.destroy()
+                    labels.clear()
+                    changes = dict.fromkeys(tracker.get_habits(), 'added')
+                for h, change in changes.items():
+                    if change == 'removed':
+                        labels.pop(h).destroy()
+                    elif change == 'added':
+                        add_label(h, describe(h, analytics_cache.completion_rate(h)))
+                    else:
+                        labels[h].config(text=describe(h, analytics_cache.completion_rate(h)))
+
+            for h in tracker.get_habits():
+                add_label(h, texts[h.name])
+            TrackerWatch(win, tracker, apply)
+
+        def done(texts):
+            analytics_cache.remember('rate-texts', tracker, sql_store, texts)
+            show(texts)
+
+        found, texts = analytics_cache.lookup('rate-texts', tracker, sql_store)
+        if found:
+            show(texts)
+        else:
+            run_in_background("Computing completion rates", summaries, done)
+
+    def view_heatmap():
         habits = tracker.get_habits()
         if not habits:
-            messagebox.showinfo("No habits", "Nothing to analyze.")
+            showinfo("No habits", "Nothing to show.")
             return
         win = tk.Toplevel(root, bg=bg)
-        win.title("Completion Rates")
-        for h in habits:
-            created = datetime.fromisoformat(h.creation_dt).date()
-            today = datetime.now().date()
-            total = (today - created).days + 1
-            completed = len(set(datetime.fromisoformat(d).date() for d in h.completion_dt))
-            rate = round((completed / total) * 100, 2) if total > 0 else 0
-            msg = f"{h.name}: {rate}% ({completed}/{total} days)"
-            tk.Label(win, text=msg, font=font_main, bg=bg, fg=text_dark).pack(anchor="w", padx=20, pady=4)
+        win.title("Year Heatmap")
+        controls = tk.Frame(win, bg=bg)
+        controls.pack(pady=10)
+        selected = tk.StringVar(value=habits[0].name)
+        year = tk.IntVar(value=datetime.now().year)
+        tk.OptionMenu(controls, selected, *[h.name for h in habits]).pack(side="left", padx=5)
+        tk.Spinbox(controls, from_=2000, to=2100, textvariable=year, width=6).pack(side="left", padx=5)
+        size, gap = 12, 2
+        canvas = tk.Canvas(win, width=54 * (size + gap) + 40, height=8 * (size + gap) + 20, bg=card_bg,
+                           highlightthickness=0)
+        canvas.pack(padx=20, pady=(0, 10))
+        summary = tk.Label(win, font=font_main, bg=bg, fg=text_dark)
+        summary.pack(pady=(0, 10))
+
+        def draw(*_):
+            try:
+                cells = analytics.get_year_heatmap(tracker, selected.get(), year.get())
+            except (tk.TclError, ValueError):
+                return  # year field is mid-edit
+            canvas.delete("all")
+            if cells is None:
+                return
+            # One column per week, Monday at the top
+            offset = cells[0][0].weekday()
+            for i, (day, count) in enumerate(cells):
+                x = 30 + (i + offset) // 7 * (size + gap)
+                y = 18 + day.weekday() * (size + gap)
+                if day.day == 1:
+                    canvas.create_text(x, 8, text=day.strftime("%b"), anchor="w", font=("Helvetica", 8))
+                canvas.create_rectangle(x, y, x + size, y + size, width=0, fill=accent if count else "#E4EAF2")
+            summary.config(text=f"{sum(count for _, count in cells)} days completed in {year.get()}")
+
+        selected.trace_add("write", draw)
+        year.trace_add("write", draw)
+        draw()
+
+    def view_due():
+        sched = scheduler or start_scheduler()
+        win = tk.Toplevel(root, bg=bg)
+        win.title("Due")
+        view = PagedTree(win, columns=("state", "due"), headings=("State", "Due"), tree_heading="Habit",
+                         font=font_main)
+        view.pack(fill="both", expand=True, padx=20, pady=10)
+        render = lambda h: (h.name, (sched.state(h), sched.next_due(h)[0].isoformat()), None)
+        listed = set()
+
+        def fill():
+            rows = sched.overdue() + sched.due_now() + sched.upcoming(7)
+            listed.clear()
+            listed.update(rows)
+            view.set_rows(rows, render)
+
+        def apply(changes):
+            # The scheduler has already seen these events; only the affected rows are patched
+            if changes is None:
+                fill()
+                return
+            for h, change in changes.items():
+                if change == 'removed':
+                    if h in listed:
+                        listed.discard(h)
+                        view.remove_row(h)
+                elif h in listed:
+                    view.update_row(h)
+                elif change == 'added' or sched.state(h) != UPCOMING:
+                    listed.add(h)
+                    view.add_row(h)
+
+        fill()
+        TrackerWatch(win, tracker, apply)
+
+    def show_timings():
+        win = tk.Toplevel(root, bg=bg)
+        win.title("Timings")
+        columns = ("calls", "total_ms", "p50_ms", "p99_ms", "max_ms", "bytes")
+        view = PagedTree(win, columns=columns, headings=("Calls", "Total ms", "p50 ms", "p99 ms", "Max ms", "Bytes"),
+                         tree_heading="Metric", font=font_main)
+        view.pack(fill="both", expand=True, padx=20, pady=10)
+        def refresh():
+            view.set_rows(instrument.report(), lambda m: (m["name"], tuple(m[c] for c in columns), None))
+        tk.Button(win, text="Refresh", command=refresh, **button_style).pack(pady=10)
+        refresh()
 
     # === Features Buttons ===
     features = [
@@ -223,10 +468,51 @@ def main():
         ("🔁 Reset", reset_streaks),
         ("📅 History", view_history),
         ("🧮 Completion Rate", view_completion_rate),
+        ("🗓 Heatmap", view_heatmap),
+        ("⏰ Due", view_due),
     ]
+    if instrument.ENABLED:
+        features.append(("🐞 Timings", show_timings))
 
     for label, func in features:
-        tk.Button(main_frame, text=label, command=func, **button_style).pack(pady=6)
+        tk.Button(main_frame, text=label, command=instrument.timed(f"gui.{func.__name__}")(func),
+                  **button_style).pack(pady=6)
+
+    # === Reminders ===
+    reminder = tk.Label(main_frame, font=font_main, bg=bg, fg=text_dark)
+    reminder.pack(pady=(10, 20))
+    scheduler = None
+
+    def start_scheduler():
+        nonlocal scheduler
+        scheduler = Scheduler(tracker)
+        TrackerWatch(reminder, tracker, lambda _: show_reminder())
+        return scheduler
+
+    def show_reminder():
+        reminder.config(text=f"⏰ {scheduler.due_count()} due, {scheduler.overdue_count()} overdue")
+
+    def remind():
+        # Each tick only visits habits whose state changes today, however many there are
+        if scheduler is None:
+            start_scheduler()
+        if any(state in (DUE, OVERDUE) for _, state in scheduler.tick()):
+            root.bell()
+        show_reminder()
+        root.after(60_000, remind)
+
+    # Built shortly after startup so a lazily loaded history doesn't hold up the first frame
+    root.after(500, remind)
+
+    probe = os.environ.get("HABIT_STARTUP_PROBE")
+    if probe:
+        # Used by bench_startup.py: write the time of the first event-loop iteration to the
+        # file it names and quit. A file, because windowed (console=False) builds have no stdout
+        def first_idle():
+            with open(probe, "w") as f:
+                f.write(f"{time.time():.6f}")
+            root.destroy()
+        root.after_idle(first_idle)
 
     root.mainloop()
 
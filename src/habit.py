@@ -1,37 +1,392 @@
-from datetime import datetime
+from array import array
+from bisect import bisect_left
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
+from itertools import count
+import warnings
+from streaks import StreakCounter, normalize_periodicity
+import bitmaps
+
+NO_TIME = -1  # second-of-day marker for completions stored as a bare date
+
+_versions = count(1)  # shared by all habits, so a version number identifies one state of one habit
+
+def stored_periodicity(name, periodicity):
+    # Periodicity read back from a data file. Older files may spell it differently ('Weekly')
+    # or hold one the streak engine rejects; rather than failing the whole load, such a habit
+    # loads as daily with a warning
+    try:
+        return normalize_periodicity(periodicity)
+    except ValueError:
+        warnings.warn(f"Habit {name!r} has an unknown periodicity {periodicity!r}; loading it as daily")
+        return 'daily'
+
+def _to_iso(day, second, micro=0):
+    if second == NO_TIME:
+        return date.fromordinal(day).isoformat()
+    return (datetime.fromordinal(day) + timedelta(seconds=second, microseconds=micro)).isoformat()
+
+def _canonical(text, when, timed):
+    # Whether _to_iso gives `text` back: a bare YYYY-MM-DD, or naive, 'T'-separated, with
+    # seconds and either no fraction or six digits of a nonzero one
+    if not timed:
+        return len(text) == 10
+    return when.tzinfo is None and text[10:11] == 'T' and len(text) == (26 if when.microsecond else 19)
+
+class Completions(Sequence):
+    # Read-only view that renders the stored day/second/microsecond arrays as ISO strings on demand
+    __slots__ = ('_habit',)
+
+    def __init__(self, habit):
+        self._habit = habit
+
+    def __len__(self):
+        return len(self._habit._event_days)
+
+    def _render(self, j):
+        habit = self._habit
+        exact = habit._event_exact
+        if exact is not None and j in exact:
+            return exact[j]
+        secs, micros = habit._event_secs, habit._event_micros
+        return _to_iso(habit._event_days[j], secs[j] if secs is not None else NO_TIME,
+                       micros[j] if micros is not None else 0)
+
+    def __getitem__(self, i):
+        n = len(self)
+        if isinstance(i, slice):
+            return [self._render(j) for j in range(*i.indices(n))]
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('completion index out of range')
+        return self._render(i)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
 
 class Habit:
-    def __init__(self, name, periodicity, creation_dt=None, completion_dt=None):
+    __slots__ = (
+        'name', 'periodicity', 'creation_dt',
+        '_event_days',  # array('i') of day ordinals, one per completion in insertion order
+        '_event_secs',  # parallel array('i') of seconds since midnight, None if all are bare dates
+        '_event_micros',  # parallel array('i') of microseconds, None if all are whole seconds
+        '_event_exact',   # {index: original text} for timestamps the arrays can't render back
+                          # exactly (UTC offsets, other ISO spellings), or None
+        '_days',        # array('i') of sorted, unique day ordinals
+        '_streak',      # StreakCounter over the habit's periods
+        '_origin',      # first day covered by _prefix
+        '_prefix',      # array('i'): _prefix[i] = completed days before _origin + i; built on demand
+        '_bits',        # int bitmap of completed days since bitmaps.EPOCH; built on demand
+        'version',      # renewed on every mutation; analytics caches and saves key on it
+        'generation',   # renewed when the whole history is replaced (new habit, reset), so a
+                        # save can tell a reset from completions appended since the last one
+        '_tracker',     # owning HabitTracker, told about mutations too
+        '_pending'      # raw completion_dt list or (days, secs[, micros, exact]) columns, or a
+                        # callable returning either, not loaded yet
+    )
+
+    def __init__(self, name, periodicity, creation_dt=None, completion_dt=None, lazy=False):
         self.name = name
-        self.periodicity = periodicity  # 'daily' or 'weekly'
+        self.periodicity = periodicity  # 'daily', 'weekly', 'monthly' or '<N>-day'
         self.creation_dt = creation_dt or datetime.now().isoformat()
-        self.completion_dt = completion_dt or []
+        self.version = self.generation = next(_versions)
+        self._tracker = None
+        if lazy and completion_dt:
+            # History is parsed the first time something needs it
+            self._pending = completion_dt
+        else:
+            self._set_completions(completion_dt or [])
 
-    def mark_completed(self):
-        self.completion_dt.append(datetime.now().isoformat())
+    @property
+    def loaded(self):
+        return self._pending is None
 
-    def get_streak(self):
-        if not self.completion_dt:
+    def _load(self):
+        pending = self._pending
+        if callable(pending):
+            pending = pending()
+        if isinstance(pending, tuple):
+            self._set_columns(*pending)
+        else:
+            self._set_completions(pending)
+
+    def _changed(self, event='changed'):
+        self.version = next(_versions)
+        if self._tracker is not None:
+            self._tracker.version += 1
+            self._tracker._notify(event, self)
+
+    # completion_dt is still the JSON field; it converts to and from the compact arrays
+    @property
+    def completion_dt(self):
+        if self._pending is not None:
+            self._load()
+        return Completions(self)
+
+    @completion_dt.setter
+    def completion_dt(self, value):
+        self._set_completions(value)
+        self.generation = next(_versions)
+        self._changed()
+
+    def _set_completions(self, value):
+        value = list(value)  # may be a view of this habit's own arrays, which are reset below
+        self._pending = None
+        self._event_days = array('i')
+        self._event_secs = None
+        self._event_micros = None
+        self._event_exact = None
+        for dt in value:
+            self._append_event(datetime.fromisoformat(dt), 'T' in dt or ' ' in dt, dt)
+        self._rebuild_index()
+
+    def _set_columns(self, days, secs, micros=None, exact=None):
+        # Buffers of int32 day ordinals, seconds (None for bare dates) and microseconds (None
+        # for whole seconds) are copied, not parsed
+        self._pending = None
+        self._event_days = self._column(days)
+        self._event_secs = self._column(secs) if secs is not None else None
+        self._event_micros = self._column(micros) if micros is not None else None
+        self._event_exact = dict(exact) if exact else None
+        self._rebuild_index()
+
+    @staticmethod
+    def _column(buffer):
+        column = array('i')
+        column.frombytes(memoryview(buffer).cast('B'))
+        return column
+
+    def event_columns(self):
+        # (days, secs, micros, exact) in insertion order; secs is None if every completion is
+        # a bare date, micros None if all are whole seconds, exact None if every one renders back
+        if self._pending is not None:
+            self._load()
+        return self._event_days, self._event_secs, self._event_micros, self._event_exact
+
+    def _append_event(self, when, timed=True, text=None):
+        i = len(self._event_days)
+        self._event_days.append(when.toordinal())
+        if timed and self._event_secs is None:
+            self._event_secs = array('i', [NO_TIME]) * i
+        if self._event_secs is not None:
+            self._event_secs.append(when.hour * 3600 + when.minute * 60 + when.second if timed else NO_TIME)
+        if when.microsecond and self._event_micros is None:
+            self._event_micros = array('i', [0]) * i
+        if self._event_micros is not None:
+            self._event_micros.append(when.microsecond)
+        if text is not None and not _canonical(text, when, timed):
+            if self._event_exact is None:
+                self._event_exact = {}
+            self._event_exact[i] = text
+
+    def _rebuild_index(self):
+        self._days = array('i', sorted(set(self._event_days)))
+        anchor = datetime.fromisoformat(self.creation_dt).toordinal()
+        self._streak = StreakCounter(self.periodicity, anchor, self._days)
+        self._prefix = None
+        self._bits = None
+
+    def _build_prefix(self):
+        # Cumulative day counts from creation (or the first completion, if earlier) to the last completion
+        days = self._days
+        origin = datetime.fromisoformat(self.creation_dt).toordinal()
+        if days and days[0] < origin:
+            origin = days[0]
+        prefix = array('i', [0])
+        for total, day in enumerate(days):
+            prefix.extend(array('i', [total]) * (day - origin + 1 - len(prefix)))
+            prefix.append(total + 1)
+        self._origin = origin
+        self._prefix = prefix
+
+    def _cumulative(self, day):
+        # Completed days strictly before `day`, O(1)
+        if self._prefix is None:
+            self._build_prefix()
+        i = day - self._origin
+        if i <= 0:
             return 0
+        prefix = self._prefix
+        return prefix[i] if i < len(prefix) else prefix[-1]
 
-        dates = sorted(datetime.fromisoformat(dt).date() for dt in self.completion_dt)
-        streak = 1
-        for i in range(len(dates) - 1, 0, -1):
-            if (dates[i] - dates[i - 1]).days == 1:
-                streak += 1
+    def _add_day(self, day):
+        i = bisect_left(self._days, day)
+        if i < len(self._days) and self._days[i] == day:
+            return
+        self._days.insert(i, day)
+        self._streak.add(day)
+        if self._bits is not None and day >= bitmaps.EPOCH:
+            self._bits |= 1 << (day - bitmaps.EPOCH)
+        prefix = self._prefix
+        if prefix is not None:
+            gap = day - self._origin + 1 - len(prefix)
+            if gap >= 0:
+                # Common case, a day after the last one: extend instead of rebuilding
+                prefix.extend(array('i', [prefix[-1]]) * gap)
+                prefix.append(prefix[-1] + 1)
             else:
-                break
-        return streak
+                self._prefix = None
+
+    def mark_completed(self, when=None):
+        # when defaults to now; pass a datetime to record a past completion
+        if self._pending is not None:
+            self._load()
+        when = when or datetime.now()
+        self._append_event(when, True, when.isoformat())
+        self._add_day(when.toordinal())
+        self._changed('completed')
+
+    def event_count(self):
+        # Number of recorded completions, without parsing a pending history
+        pending = self._pending
+        if isinstance(pending, list):
+            return len(pending)
+        if callable(pending):
+            pending = self._pending = pending()  # keep the raw columns, still unparsed
+        if isinstance(pending, tuple):
+            return len(pending[0])
+        return len(pending if pending is not None else self._event_days)
+
+    def extend_completions(self, completion_dt):
+        # Append ISO timestamps as they are, e.g. replayed from a journal
+        if self._pending is not None:
+            self._load()
+        for dt in completion_dt:
+            when = datetime.fromisoformat(dt)
+            self._append_event(when, 'T' in dt or ' ' in dt, dt)
+            self._add_day(when.toordinal())
+        self._changed('completed')
+
+    @property
+    def completion_days(self):
+        # Sorted, de-duplicated day ordinals; treat as read-only
+        if self._pending is not None:
+            self._load()
+        return self._days
+
+    @property
+    def completion_bits(self):
+        # Completed days as an int bitmap (see bitmaps.py), for set algebra across habits
+        if self._pending is not None:
+            self._load()
+        if self._bits is None:
+            self._bits = bitmaps.from_days(self._days)
+        return self._bits
+
+    def last_day(self):
+        # Latest completed day ordinal, None if never completed. A pending history is not
+        # parsed: ISO timestamps compare as strings in date order
+        pending = self._pending
+        if pending is None:
+            return self._days[-1] if self._days else None
+        if callable(pending):
+            pending = self._pending = pending()
+        if isinstance(pending, tuple):
+            return max(pending[0]) if len(pending[0]) else None
+        try:
+            return date.fromisoformat(max(pending)[:10]).toordinal()
+        except ValueError:  # not YYYY-MM-DD...; parse it after all
+            return self.completion_days[-1]
+
+    def get_streak(self):
+        if self._pending is not None:
+            self._load()
+        return self._streak.current
+
+    def get_longest_streak(self):
+        if self._pending is not None:
+            self._load()
+        return self._streak.longest
+
+    def count_completions(self, start=None, end=None):
+        # Distinct completed days within [start, end] (dates or datetimes): O(1) from the
+        # prefix index once built, O(log n) by bisect otherwise
+        if self._pending is not None:
+            self._load()
+        if start is None and end is None:
+            return len(self._days)
+        if self._prefix is None:
+            # Index not built, or dropped by a back-filled day: bisect rather than rebuild it
+            # per query, which would make out-of-order inserts quadratic
+            days = self._days
+            lo = bisect_left(days, start.toordinal()) if start is not None else 0
+            hi = bisect_left(days, end.toordinal() + 1) if end is not None else len(days)
+            return max(hi - lo, 0)
+        lo = self._cumulative(start.toordinal()) if start is not None else 0
+        hi = self._cumulative(end.toordinal() + 1) if end is not None else len(self._days)
+        return max(hi - lo, 0)
+
+    def completion_rate(self, start=None, end=None):
+        # Percentage of days completed within [start, end], clipped to creation..today
+        first = date.fromisoformat(self.creation_dt[:10])
+        start = max(start.date() if isinstance(start, datetime) else start or first, first)
+        end = min(end.date() if isinstance(end, datetime) else end or date.today(), date.today())
+        total = (end - start).days + 1
+        if total <= 0:
+            return 0
+        return round(self.count_completions(start, end) / total * 100, 2)
+
+    def daily_counts(self, start, end):
+        # 0/1 per day from start to end inclusive, read off the prefix index in one pass
+        if self._pending is not None:
+            self._load()
+        previous = self._cumulative(start.toordinal())
+        counts = []
+        for day in range(start.toordinal() + 1, end.toordinal() + 2):
+            current = self._cumulative(day)
+            counts.append(current - previous)
+            previous = current
+        return counts
+
+    def copy(self):
+        # Independent copy, e.g. to hand a snapshot to another thread; arrays are memcpy'd
+        other = Habit.__new__(Habit)
+        other.name = self.name
+        other.periodicity = self.periodicity
+        other.creation_dt = self.creation_dt
+        other.version = self.version
+        other.generation = self.generation
+        other._tracker = None
+        other._pending = self._pending
+        if self._pending is not None:
+            return other
+        other._event_days = self._event_days[:]
+        other._event_secs = self._event_secs[:] if self._event_secs is not None else None
+        other._event_micros = self._event_micros[:] if self._event_micros is not None else None
+        other._event_exact = dict(self._event_exact) if self._event_exact is not None else None
+        other._days = self._days[:]
+        other._streak = self._streak.copy()
+        other._prefix = None
+        other._bits = self._bits
+        return other
+
+    def to_dict(self):
+        # An untouched raw history is written back as-is without parsing it
+        pending = self._pending
+        return {
+            'name': self.name,
+            'periodicity': self.periodicity,
+            'creation_dt': self.creation_dt,
+            'completion_dt': pending if isinstance(pending, list) else list(self.completion_dt)
+        }
+
+    @classmethod
+    def from_dict(cls, d, lazy=False):
+        return cls(d['name'], stored_periodicity(d['name'], d['periodicity']), d['creation_dt'],
+                   d['completion_dt'], lazy=lazy)
 
 def reset_streak(self):
     self.completion_dt = []
 
 def get_completion_rate(self):
-    if not self.completion_dt:
+    completed = bitmaps.popcount(self.completion_bits)
+    if not completed:
         return 0
-    from datetime import datetime
     first = datetime.fromisoformat(self.creation_dt).date()
     last = datetime.now().date()
     total_days = (last - first).days + 1
-    return round(len(set(self.completion_dt)) / total_days * 100, 2) if total_days > 0 else 0
-
+    return round(completed / total_days * 100, 2) if total_days > 0 else 0
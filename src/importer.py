@@ -0,0 +1,127 @@
+"""Bulk import of completion events from CSV or JSON Lines.
+
+    python importer.py history.csv
+    python importer.py export.jsonl --batch 50000
+    HABIT_SQLITE=1 python importer.py history.csv
+
+Each row carries a habit name, an optional periodicity (default daily) and an
+ISO timestamp. CSV files need a header with `name`, `periodicity` and
+`timestamp` columns; JSONL rows are objects with the same keys. Unknown habits
+are created with the timestamp of their first row as creation date (so input
+sorted by time gives the most accurate rates), and a habit is completed at
+most once per day. Rows are streamed and written to the store's journal (or
+database) in batches. Imported completions are not kept in memory: each habit
+only gets a bitmap of its completed days to spot repeats, so memory grows with
+the number of habits and the days they span, not with the number of rows.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from bitmaps import EPOCH
+from data_manager import DataManager
+from tracker import HabitTracker
+
+
+def read_rows(path, fmt=None):
+    fmt = fmt or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, newline='') as f:
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Importer:
+    def __init__(self, tracker, store, batch=10000):
+        self.tracker = tracker
+        self.store = store
+        self.batch = batch
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.errors = 0
+        self._events = []
+        self._done = {}  # habit -> [bitmap of completed days since EPOCH, set of days before it]
+
+    def add(self, row):
+        self.rows += 1
+        try:
+            name = row['name'].strip()
+            periodicity = row.get('periodicity') or 'daily'
+            when = datetime.fromisoformat(row['timestamp']).replace(tzinfo=None)
+            habit = self.tracker.find_habit(name)
+            if habit is None:
+                self.tracker.add_habit(name, periodicity, when.replace(microsecond=0).isoformat())
+                habit = self.tracker.find_habit(name)
+                self._events.append({'op': 'add', 'name': habit.name, 'periodicity': habit.periodicity,
+                                     'creation_dt': habit.creation_dt})
+        except (KeyError, AttributeError, TypeError, ValueError):
+            self.errors += 1
+            return
+        if not self._first_on_day(habit, when.toordinal()):
+            self.duplicates += 1
+            return
+        self._events.append({'op': 'complete', 'name': habit.name, 'ts': when.isoformat()})
+        self.imported += 1
+        if len(self._events) >= self.batch:
+            self.commit()
+
+    def _first_on_day(self, habit, day):
+        # Records `day` for the habit; False if it was already completed then, on file or imported
+        done = self._done.get(habit)
+        if done is None:
+            done = self._done[habit] = [habit.completion_bits,
+                                        {d for d in habit.completion_days if d < EPOCH}]
+        if day < EPOCH:
+            if day in done[1]:
+                return False
+            done[1].add(day)
+            return True
+        bit = 1 << (day - EPOCH)
+        if done[0] & bit:
+            return False
+        done[0] |= bit
+        return True
+
+    def commit(self):
+        if self._events:
+            self.store.append_events(self._events)
+            self._events = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='default: from the file extension')
+    parser.add_argument('--batch', type=int, default=10000, help='events per journal write / transaction')
+    args = parser.parse_args(argv)
+
+    store = DataManager
+    if os.environ.get('HABIT_SQLITE') == '1':
+        from sqlite_manager import SqliteDataManager
+        store = SqliteDataManager
+    tracker = HabitTracker()
+    tracker.habits = store.load_data(lazy=True)
+
+    importer = Importer(tracker, store, args.batch)
+    start = time.perf_counter()
+    for row in read_rows(args.path, args.format):
+        importer.add(row)
+    importer.commit()
+    seconds = time.perf_counter() - start
+
+    rate = importer.rows / seconds if seconds else 0
+    print(f'{importer.rows} rows in {seconds:.2f}s ({rate:.0f} rows/s): {importer.imported} imported, '
+          f'{importer.duplicates} duplicate days, {importer.errors} invalid', file=sys.stderr)
+    return 1 if importer.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Opt-in timing of GUI handlers, storage and analytics.
+
+    HABIT_PROFILE=timings.json python gui.py
+    HABIT_PROFILE=timings.csv python main.py
+    HABIT_PROFILE=1 python gui.py            # debug window only, no report file
+
+Off by default. `timed()` then returns the function unchanged and `install()`
+does nothing, so nothing is wrapped and there is no per-call cost. When on,
+each call records its latency in a log2 histogram (1 us buckets upwards) with
+a call count and total. Storage calls also record the size of the data file.
+Time spent in functions wrapped with `untimed()` (modal dialogs) is left out
+of the timed call around them.
+The report is written on exit to the path in HABIT_PROFILE when that path
+ends in .json or .csv.
+"""
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+PROFILE = os.environ.get('HABIT_PROFILE', '')
+ENABLED = bool(PROFILE) and PROFILE != '0'
+
+BUCKETS = 32  # bucket i holds latencies in [2**(i-1), 2**i) microseconds
+
+
+class Metric:
+    __slots__ = ('name', 'calls', 'total', 'max', 'bytes', 'histogram')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.histogram = [0] * BUCKETS
+
+    def record(self, seconds, nbytes=0):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.bytes += nbytes
+        self.histogram[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, p):
+        # Upper edge of the bucket holding the p-th percentile, in seconds
+        target = self.calls * p / 100
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if n and seen >= target:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total / self.calls * 1000, 3) if self.calls else 0,
+            'p50_ms': round(self.percentile(50) * 1000, 3),
+            'p99_ms': round(self.percentile(99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'bytes': self.bytes,
+        }
+
+
+_metrics = {}
+_lock = threading.Lock()
+_local = threading.local()  # .excluded: untimed() seconds inside the current timed call
+
+
+def metric(name):
+    with _lock:
+        m = _metrics.get(name)
+        if m is None:
+            m = _metrics[name] = Metric(name)
+        return m
+
+
+def timed(name=None, size=None):
+    """Decorator recording each call under `name`; `size()` gives bytes moved, if any."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        m = metric(name or f'{fn.__module__}.{fn.__qualname__}')
+        if inspect.isgeneratorfunction(fn):
+            return _timed_generator(fn, m)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            outer = getattr(_local, 'excluded', 0.0)
+            _local.excluded = 0.0
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                excluded = _local.excluded
+                _local.excluded = outer + excluded  # also left out of any timed call around this one
+                with _lock:
+                    m.record(elapsed - excluded, size() if size else 0)
+        return wrapper
+    return decorate
+
+
+def _timed_generator(fn, m):
+    # A chunked analysis (analytics.iter_*) does its work while it is iterated, so the time
+    # spent inside it is summed over every step and recorded once when it ends or is closed
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        elapsed = 0.0
+        steps = fn(*args, **kwargs)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(steps)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            steps.close()
+            with _lock:
+                m.record(elapsed)
+    return wrapper
+
+
+def untimed(fn):
+    """Leave the time spent in `fn` out of the timed() call around it, e.g. a modal dialog."""
+    if not ENABLED:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.excluded = getattr(_local, 'excluded', 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def install():
+    """Wrap DataManager, analytics and Habit.get_streak in place when enabled."""
+    if not ENABLED:
+        return
+    import analytics
+    from data_manager import DataManager
+    from habit import Habit
+
+    size = lambda: _file_size(DataManager.FILE)
+    for attr in ('save_data', 'load_data'):
+        fn = getattr(DataManager, attr)
+        setattr(DataManager, attr, staticmethod(timed(f'DataManager.{attr}', size)(fn)))
+    for attr in ('get_all_habits', 'get_habits_by_periodicity', 'get_longest_streak',
+                 'get_longest_streak_for_habit', 'count_completions', 'get_completion_rates',
+                 'get_completion_rate_between', 'get_rollup', 'get_year_heatmap',
+                 'get_days_all_completed', 'get_days_any_completed', 'get_co_completion',
+                 'get_weekday_rates', 'get_best_weekday', 'habit_completion_rate', 'iter_per_habit',
+                 'iter_completion_rates', 'iter_longest_streak'):
+        setattr(analytics, attr, timed(f'analytics.{attr}')(getattr(analytics, attr)))
+    Habit.get_streak = timed('Habit.get_streak')(Habit.get_streak)
+
+
+def report():
+    with _lock:
+        return sorted((m.summary() for m in _metrics.values()), key=lambda s: s['total_ms'], reverse=True)
+
+
+def export(path):
+    rows = report()
+    with open(path, 'w', newline='') as f:
+        if path.endswith('.csv'):
+            import csv
+            writer = csv.DictWriter(f, list(Metric('').summary()))
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=4)
+
+
+if ENABLED and PROFILE.endswith(('.json', '.csv')):
+    atexit.register(export, PROFILE)
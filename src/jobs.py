@@ -0,0 +1,117 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tracker import HabitTracker
+
+
+class Job:
+    """Handle for one submitted analysis; cancel() stops it between chunks."""
+
+    def __init__(self, analysis, kwargs, on_done, on_progress):
+        self.analysis = analysis
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.version = None  # tracker version the running snapshot was taken at
+        self.running = False
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self.running = False
+
+
+class AnalyticsRunner:
+    """Runs chunked analytics (the analytics.iter_* functions) off the Tk thread.
+
+    submit() snapshots the tracker on the Tk thread, which only copies arrays,
+    and runs the analysis over the copy on a worker pool. Progress and results
+    go through a queue that a root.after poll drains, so every callback runs on
+    the Tk thread. Progress is coalesced to the latest value per poll. A
+    cancelled job stops at its next chunk and reports nothing. A result
+    computed from a tracker version that is no longer current is discarded and
+    the job reruns on fresh data.
+    """
+
+    def __init__(self, root, tracker, on_error, workers=2, interval=50):
+        self.root = root
+        self.tracker = tracker
+        self._on_error = on_error  # Tk thread
+        self._interval = interval
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analytics')
+        self._events = queue.Queue()
+        self._jobs = set()
+        self._after_id = None
+
+    def submit(self, analysis, on_done, on_progress=None, **kwargs):
+        # analysis(tracker, **kwargs) yields (done, total, partial result); the last one is final
+        job = Job(analysis, kwargs, on_done, on_progress)
+        self._start(job)
+        return job
+
+    def _start(self, job):
+        snapshot = HabitTracker()
+        snapshot.habits = [h.copy() for h in self.tracker.get_habits()]
+        job.version = self.tracker.version
+        job.running = True
+        self._jobs.add(job)
+        self._pool.submit(self._run, job, snapshot, job.version)
+        if self._after_id is None:
+            self._after_id = self.root.after(self._interval, self._poll)
+
+    def _run(self, job, snapshot, version):
+        if job.cancelled:
+            return  # still queued when it was cancelled
+        try:
+            result = None
+            for done, total, result in job.analysis(snapshot, **job.kwargs):
+                if job.cancelled:
+                    return
+                self._events.put((job, version, 'progress', (done, total)))
+            self._events.put((job, version, 'done', result))
+        except Exception as e:
+            self._events.put((job, version, 'error', e))
+
+    def _poll(self):
+        self._after_id = None
+        progress = {}
+        while True:
+            try:
+                job, version, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if job.cancelled or version != job.version:
+                continue  # cancelled, or from a run that was superseded by a rerun
+            if kind == 'progress':
+                progress[job] = payload
+                continue
+            progress.pop(job, None)
+            self._jobs.discard(job)
+            job.running = False
+            if kind == 'error':
+                self._on_error(payload)
+            elif job.version != self.tracker.version:
+                self._start(job)  # data changed while it ran
+            else:
+                job.on_done(payload)
+        for job, (done, total) in progress.items():
+            if job.running and job.on_progress is not None:
+                job.on_progress(done, total)
+        self._jobs = {job for job in self._jobs if not job.cancelled}
+        if self._jobs and self._after_id is None:
+            self._after_id = self.root.after(self._interval, self._poll)
+
+    def shutdown(self):
+        # Called on exit: running jobs stop at their next chunk instead of holding up the process
+        for job in self._jobs:
+            job.cancel()
+        self._jobs.clear()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._pool.shutdown(wait=False)  # queued runs see their job cancelled and return at once
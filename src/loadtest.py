@@ -0,0 +1,164 @@
+"""Load test for server.py against localhost.
+
+    python loadtest.py --spawn --clients 50 --requests 20000
+    python loadtest.py --port 8765 --write-ratio 0.5 -o load.json
+
+Each client keeps one connection open and sends a mix of completions and
+reads (streak, rate, all rates) across `--habits` habits. Latency percentiles and
+requests per second are printed as JSON. `--spawn` starts a server on a
+scratch data directory first and stops it afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.writer.write(f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+                          f'Content-Length: {len(data)}\r\n\r\n'.encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+        await self.reader.readexactly(length)
+        return status
+
+    def close(self):
+        self.writer.close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+async def run(host, port, clients, requests, habits, write_ratio, seed):
+    names = [f'loadtest-{i}' for i in range(habits)]
+    setup = Client(host, port)
+    await setup.connect()
+    for name in names:
+        await setup.request('POST', '/habits', {'name': name, 'periodicity': 'daily'})
+    setup.close()
+
+    latencies = {'write': [], 'read': []}
+    errors = 0
+    remaining = requests
+
+    async def worker(i):
+        nonlocal remaining, errors
+        rng = random.Random(seed + i)
+        client = Client(host, port)
+        await client.connect()
+        while remaining > 0:
+            remaining -= 1
+            name = quote(rng.choice(names))
+            if rng.random() < write_ratio:
+                kind, method, path = 'write', 'POST', f'/habits/{name}/complete'
+            else:
+                kind, method = 'read', 'GET'
+                path = rng.choice((f'/habits/{name}/streak', f'/habits/{name}/rate', '/rates'))
+            start = time.perf_counter()
+            status = await client.request(method, path)
+            latencies[kind].append(time.perf_counter() - start)
+            errors += status >= 400
+        client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    def summary(values):
+        values = sorted(values)
+        return {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3),
+            'mean_ms': round(statistics.fmean(values) * 1000, 3) if values else 0,
+        }
+
+    return {
+        'clients': clients,
+        'requests': requests,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rps': round(requests / elapsed, 1),
+        'all': summary(latencies['write'] + latencies['read']),
+        'write': summary(latencies['write']),
+        'read': summary(latencies['read']),
+    }
+
+
+def spawn_server(port):
+    workdir = tempfile.mkdtemp(prefix='habit-load-')
+    env = dict(os.environ, PYTHONPATH=HERE + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, 'server.py'), '--port', str(port)],
+                            cwd=workdir, env=env, stderr=subprocess.PIPE, text=True)
+    proc.stderr.readline()  # "Serving ..." once it is listening
+    return proc, workdir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--spawn', action='store_true', help='start a throwaway server first')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--habits', type=int, default=20)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output')
+    args = parser.parse_args(argv)
+
+    proc = workdir = None
+    if args.spawn:
+        proc, workdir = spawn_server(args.port)
+    try:
+        report = asyncio.run(run(args.host, args.port, args.clients, args.requests, args.habits,
+                                 args.write_ratio, args.seed))
+    finally:
+        if proc is not None:
+            # SIGINT lets the server flush and print its commit stats
+            proc.send_signal(signal.SIGINT if os.name != 'nt' else signal.SIGTERM)
+            report_tail = proc.communicate(timeout=10)[1].strip()
+            if report_tail:
+                print(report_tail, file=sys.stderr)
+            shutil.rmtree(workdir, ignore_errors=True)
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 # Standard library imports
 import os
 import sys
+import time
 from datetime import datetime
 from tkinter import messagebox
 
@@ -8,6 +9,12 @@ from tkinter import messagebox
 import ttkbootstrap as ttkb
 from ttkbootstrap.constants import *
 
+from streaks import StreakCounter
+import instrument
+
+# Modal dialogs wait on the user, so instrumented handlers leave them out
+showerror, showinfo = map(instrument.untimed, (messagebox.showerror, messagebox.showinfo))
+
 
 # === Habit Class ===
 class Habit:
@@ -16,34 +23,22 @@ class Habit:
         self.periodicity = periodicity  # 'daily' or 'weekly'
         self.completion_dates = []      # List of dates when habit was marked as completed
         self.streak = 0                 # Current streak count
+        self._streaks = StreakCounter(periodicity)
 
     def mark_completed(self):
         """Mark habit as completed for today if not already marked."""
         today = datetime.now().date()
-        if today not in self.completion_dates:
+        if today not in self.completion_dates[-1:]:
             self.completion_dates.append(today)
-            self.update_streak()
+            self._streaks.add(today.toordinal())
+            self.streak = self._streaks.current
             return True
         return False
 
     def update_streak(self):
-        """Calculate and update the current streak based on completion history."""
-        if not self.completion_dates:
-            self.streak = 0
-            return
-
-        sorted_dates = sorted(self.completion_dates, reverse=True)
-        current_streak = 1
-
-        for i in range(1, len(sorted_dates)):
-            delta = (sorted_dates[i - 1] - sorted_dates[i]).days
-            expected = 1 if self.periodicity == "daily" else 7
-            if delta == expected:
-                current_streak += 1
-            else:
-                break
-
-        self.streak = current_streak
+        """Recalculate the current streak from the full completion history."""
+        self._streaks = StreakCounter(self.periodicity, days=(d.toordinal() for d in self.completion_dates))
+        self.streak = self._streaks.current
 
     def get_completion_rate(self):
         """Calculate percentage of expected completions that were completed."""
@@ -59,37 +54,41 @@ class Habit:
 # === HabitTracker Class ===
 class HabitTracker:
     def __init__(self):
-        self.habits = []
+        self._index = {}  # case-folded name -> Habit, in insertion order
+
+    @property
+    def habits(self):
+        return list(self._index.values())
+
+    @habits.setter
+    def habits(self, habits):
+        self._index = {}
+        for habit in habits:
+            self._index.setdefault(habit.name.casefold(), habit)
 
     def add_habit(self, name, periodicity):
         """Add a new habit if not duplicate and valid periodicity."""
         if periodicity not in ["daily", "weekly"]:
             return False
-        if not any(h.name.lower() == name.lower() for h in self.habits):
-            self.habits.append(Habit(name, periodicity))
-            return True
-        return False
+        key = name.casefold()
+        if key in self._index:
+            return False
+        self._index[key] = Habit(name, periodicity)
+        return True
 
     def find_habit(self, name):
         """Find a habit by name (case insensitive)."""
-        for habit in self.habits:
-            if habit.name.lower() == name.lower():
-                return habit
-        return None
+        return self._index.get(name.casefold())
 
     def delete_habit(self, name):
         """Remove a habit by name."""
-        habit = self.find_habit(name)
-        if habit:
-            self.habits.remove(habit)
-            return True
-        return False
+        return self._index.pop(name.casefold(), None) is not None
 
     def reset_all_streaks(self):
         """Clear all habits' completion data and streaks."""
         for habit in self.habits:
-            habit.streak = 0
             habit.completion_dates = []
+            habit.update_streak()
 
 
 # === Analytics Class ===
@@ -180,27 +179,27 @@ def create_habit_tracker_gui():
         name = name_entry.get().strip()
         periodicity = periodicity_choice.get()
         if not name:
-            messagebox.showerror("Error", "Habit name required.")
+            showerror("Error", "Habit name required.")
             return
         if tracker.add_habit(name, periodicity):
-            messagebox.showinfo("Success", f"Habit '{name}' added.")
+            showinfo("Success", f"Habit '{name}' added.")
         else:
-            messagebox.showerror("Error", "Invalid input or habit already exists.")
+            showerror("Error", "Invalid input or habit already exists.")
 
     def complete_habit():
         name = name_entry.get().strip()
         habit = tracker.find_habit(name)
         if habit and habit.mark_completed():
-            messagebox.showinfo("Success", f"Habit '{name}' marked as completed.")
+            showinfo("Success", f"Habit '{name}' marked as completed.")
         else:
-            messagebox.showerror("Error", "Habit not found or already completed today.")
+            showerror("Error", "Habit not found or already completed today.")
 
     def delete_habit():
         name = name_entry.get().strip()
         if tracker.delete_habit(name):
-            messagebox.showinfo("Deleted", f"Habit '{name}' deleted.")
+            showinfo("Deleted", f"Habit '{name}' deleted.")
         else:
-            messagebox.showerror("Error", "Habit not found.")
+            showerror("Error", "Habit not found.")
 
     def list_habits():
         list_win = ttkb.Toplevel(app)
@@ -223,13 +222,13 @@ def create_habit_tracker_gui():
     def show_longest_streak():
         habit = analytics.get_longest_streak(tracker)
         if habit:
-            messagebox.showinfo("Longest Streak", f"{habit.name}: {habit.streak} {'day' if habit.periodicity == 'daily' else 'week'} streak")
+            showinfo("Longest Streak", f"{habit.name}: {habit.streak} {'day' if habit.periodicity == 'daily' else 'week'} streak")
         else:
-            messagebox.showinfo("Info", "No habits available.")
+            showinfo("Info", "No habits available.")
 
     def reset_streaks():
         tracker.reset_all_streaks()
-        messagebox.showinfo("Reset", "All streaks and completions reset.")
+        showinfo("Reset", "All streaks and completions reset.")
 
     def analyze_habits():
         analysis_win = ttkb.Toplevel(app)
@@ -252,6 +251,20 @@ def create_habit_tracker_gui():
             rate = habit.get_completion_rate()
             ttkb.Label(frame, text=f"{habit.name} ({habit.periodicity}) → {rate}%", justify=LEFT).pack(anchor=W)
 
+    def show_timings():
+        timings_win = ttkb.Toplevel(app)
+        timings_win.title("🐞 Timings")
+        timings_win.geometry("640x320")
+        columns = ("calls", "total_ms", "p50_ms", "p99_ms", "max_ms")
+        table = ttkb.Treeview(timings_win, columns=columns)
+        table.heading("#0", text="Metric")
+        for column in columns:
+            table.heading(column, text=column)
+            table.column(column, width=80, anchor=E)
+        table.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        for m in instrument.report():
+            table.insert("", END, text=m["name"], values=tuple(m[c] for c in columns))
+
     # === Action Buttons ===
     actions = [
         ("➕ Add Habit", add_habit),
@@ -262,9 +275,22 @@ def create_habit_tracker_gui():
         ("📊 Analyze Habits", analyze_habits),
         ("🔄 Reset All", reset_streaks),
     ]
+    if instrument.ENABLED:
+        actions.append(("🐞 Timings", show_timings))
 
     for text, cmd in actions:
-        ttkb.Button(content_frame, text=text, command=cmd, bootstyle="primary", width=25).pack(pady=6, ipadx=6, ipady=6)
+        ttkb.Button(content_frame, text=text, command=instrument.timed(f"main.{cmd.__name__}")(cmd),
+                    bootstyle="primary", width=25).pack(pady=6, ipadx=6, ipady=6)
+
+    probe = os.environ.get("HABIT_STARTUP_PROBE")
+    if probe:
+        # Used by bench_startup.py: write the time of the first event-loop iteration to the
+        # file it names and quit. A file, because windowed (console=False) builds have no stdout
+        def first_idle():
+            with open(probe, "w") as f:
+                f.write(f"{time.time():.6f}")
+            app.destroy()
+        app.after_idle(first_idle)
 
     # Start main event loop
     app.mainloop()
@@ -0,0 +1,79 @@
+import queue
+import threading
+
+
+class WriteBehindPersister:
+    """Moves full saves off the Tk thread and collapses bursts into one write.
+
+    schedule() only marks the data dirty. After `delay` ms of quiet the Tk
+    thread takes a cheap snapshot and hands it to a worker thread, which does
+    the slow serialization and write. At most one write is in flight; changes
+    made meanwhile are picked up by the next one. Errors are queued by the
+    worker and reported on the Tk thread from a root.after poll, which marks
+    the data dirty again so the next save or flush() writes it.
+    """
+
+    def __init__(self, root, snapshot, save, on_error, delay=200):
+        self.root = root
+        self._snapshot = snapshot  # Tk thread, must be cheap
+        self._save = save          # worker thread
+        self._on_error = on_error  # Tk thread
+        self._delay = delay
+        self._dirty = False
+        self._after_id = None
+        self._jobs = queue.Queue()
+        self._errors = queue.Queue()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+        self._poll_errors()
+
+    def schedule(self):
+        self._dirty = True
+        if self._after_id is None:
+            self._after_id = self.root.after(self._delay, self._submit)
+
+    def _submit(self):
+        self._after_id = None
+        if not self._dirty:
+            return
+        if not self._idle.is_set():
+            # A write is still running; this burst rides on the next one
+            self._after_id = self.root.after(self._delay, self._submit)
+            return
+        self._dirty = False
+        self._idle.clear()
+        self._jobs.put(self._snapshot())
+
+    def _run(self):
+        while True:
+            data = self._jobs.get()
+            if data is None:
+                return
+            try:
+                self._save(data)
+            except Exception as e:
+                self._errors.put(e)
+            finally:
+                self._idle.set()
+
+    def _poll_errors(self):
+        while not self._errors.empty():
+            self._dirty = True  # that write never landed
+            self._on_error(self._errors.get())
+        self.root.after(250, self._poll_errors)
+
+    def flush(self):
+        # Called on exit: wait for the write in flight, then save anything newer synchronously
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._idle.wait()
+        self._jobs.put(None)
+        self._worker.join()
+        if not self._errors.empty():
+            self._dirty = True  # the last write failed and was never reported
+        if self._dirty:
+            self._dirty = False
+            self._save(self._snapshot())
@@ -0,0 +1,168 @@
+import heapq
+from datetime import date, datetime
+from itertools import count
+
+from streaks import bucket_of, period_start
+
+UPCOMING, DUE, OVERDUE = 'upcoming', 'due', 'overdue'
+
+
+def due_window(habit):
+    """(due, late) day ordinals for a habit, read off its periodicity and last completion.
+
+    The habit is due from the start of the first period after its last
+    completed one (or its creation period if it was never completed) and
+    overdue once that period has ended without a completion. Lazily loaded
+    histories stay unparsed.
+    """
+    anchor = datetime.fromisoformat(habit.creation_dt).toordinal()
+    bucket = bucket_of(habit.periodicity, anchor)
+    start = period_start(habit.periodicity, anchor)
+    last = habit.last_day()
+    period = bucket(last) + 1 if last is not None else bucket(anchor)
+    return start(period), start(period + 1)
+
+
+class Scheduler:
+    """Tracks which habits are upcoming, due now or overdue.
+
+    Each habit's (due, late) window is derived once and updated only when the
+    habit changes. A min-heap holds every habit's next state change (becoming
+    due, or becoming overdue), so tick() only touches habits whose state
+    actually changes that day, and add/remove/update are O(log n). Removed or
+    rescheduled entries are left in the heap and skipped, and the heap is
+    rebuilt once they outnumber the live ones. Given a tracker, the scheduler
+    follows its events, so mark_completed, add and delete keep it current.
+    """
+
+    def __init__(self, tracker=None, today=None):
+        self.today = (today or date.today()).toordinal()
+        self._heap = []       # [day of next state change, tie-breaker, habit or None once stale]
+        self._entries = {}    # habit -> its live heap entry
+        self._windows = {}    # habit -> (due, late) day ordinals
+        self._due = {}        # habits due now
+        self._overdue = {}    # habits overdue
+        self._order = count()
+        self._tracker = tracker
+        self._unsubscribe = None
+        if tracker is not None:
+            self._reload()
+            self._unsubscribe = tracker.subscribe(self._on_event)
+
+    def _on_event(self, event, habit):
+        if event == 'reloaded':
+            self._reload()
+        elif event == 'removed':
+            self.remove(habit)
+        else:
+            self.update(habit)
+
+    def _reload(self):
+        self._heap, self._entries, self._windows = [], {}, {}
+        self._due, self._overdue = {}, {}
+        for habit in self._tracker.get_habits():
+            self.add(habit)
+
+    def close(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    # === Updates ===
+    def add(self, habit):
+        self._windows[habit] = due_window(habit)
+        self._place(habit)
+
+    def update(self, habit):
+        self._unplace(habit)
+        self.add(habit)
+
+    def remove(self, habit):
+        self._unplace(habit)
+        self._windows.pop(habit, None)
+
+    def _place(self, habit):
+        due, late = self._windows[habit]
+        if self.today < due:
+            self._push(habit, due)
+        elif self.today < late:
+            self._due[habit] = None
+            self._push(habit, late)
+        else:
+            self._overdue[habit] = None  # stays overdue until the habit changes
+
+    def _unplace(self, habit):
+        entry = self._entries.pop(habit, None)
+        if entry is not None:
+            entry[2] = None
+        self._due.pop(habit, None)
+        self._overdue.pop(habit, None)
+
+    def _push(self, habit, day):
+        entry = [day, next(self._order), habit]
+        self._entries[habit] = entry
+        heapq.heappush(self._heap, entry)
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [e for e in self._heap if e[2] is not None]
+            heapq.heapify(self._heap)
+
+    def tick(self, today=None):
+        """Advance to `today` and return [(habit, new state)] for the habits whose state changed."""
+        self.today = (today or date.today()).toordinal()
+        changes = []
+        heap = self._heap
+        while heap and heap[0][0] <= self.today:
+            _, _, habit = heapq.heappop(heap)
+            if habit is None:
+                continue
+            self._unplace(habit)
+            self._place(habit)
+            changes.append((habit, self.state(habit)))
+        return changes
+
+    # === Queries ===
+    def state(self, habit):
+        if habit in self._due:
+            return DUE
+        if habit in self._overdue:
+            return OVERDUE
+        return UPCOMING if habit in self._windows else None
+
+    def next_due(self, habit):
+        # (date due, date overdue from) for a scheduled habit
+        due, late = self._windows[habit]
+        return date.fromordinal(due), date.fromordinal(late)
+
+    def due_count(self):
+        return len(self._due)
+
+    def overdue_count(self):
+        return len(self._overdue)
+
+    def due_now(self):
+        # Habits due now, those closest to becoming overdue first
+        return sorted(self._due, key=lambda h: self._windows[h][1])
+
+    def overdue(self):
+        # Overdue habits, longest overdue first
+        return sorted(self._overdue, key=lambda h: self._windows[h][1])
+
+    def upcoming(self, days=7):
+        """Habits becoming due within `days`, soonest first.
+
+        Walks only the heap nodes due in the window (a heap's children are
+        never earlier than their parent), so the cost follows the result size.
+        """
+        limit = self.today + days
+        heap = self._heap
+        found = []
+        stack = [0]
+        while stack:
+            i = stack.pop()
+            if i >= len(heap) or heap[i][0] > limit:
+                continue
+            day, order, habit = heap[i]
+            if habit is not None and habit not in self._due:
+                found.append((day, order, habit))
+            stack.extend((2 * i + 1, 2 * i + 2))
+        return [habit for _, _, habit in sorted(found)]
@@ -0,0 +1,258 @@
+"""Local HTTP/JSON API so several clients can share one tracker.
+
+    python server.py --port 8765
+    HABIT_SQLITE=1 python server.py
+
+    GET    /habits                     all habits with streak and completion count
+    POST   /habits                     {"name": ..., "periodicity": ...}
+    DELETE /habits/<name>
+    POST   /habits/<name>/complete
+    GET    /habits/<name>/streak       {"current": ..., "longest": ...}
+    GET    /habits/<name>/rate         {"rate": ...}
+    GET    /rates                      {name: rate, ...}
+
+The tracker lives in memory on the event loop; lazily loaded histories are
+fetched on a worker thread, so reads never block the loop on the disk.
+Journal events are queued and one committer writes everything queued so far
+in a single append_events() call on a worker thread. Completions and deletes
+reach memory only once their event is durable; a new habit is added right
+away to claim its name and taken out again if its event can't be written.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import unquote
+
+import analytics_cache
+from data_manager import DataManager
+from tracker import HabitTracker
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class GroupCommitter:
+    """Batches events from concurrent requests into one store write."""
+
+    def __init__(self, store):
+        self.store = store
+        self.batches = 0
+        self.events = 0
+        self._queue = []
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def commit(self, event):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((event, future))
+        self._wakeup.set()
+        await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Everything queued while the previous write was in flight goes in this one
+            batch, self._queue = self._queue, []
+            if not batch:
+                continue
+            try:
+                await loop.run_in_executor(None, self.store.append_events, [e for e, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.events += len(batch)
+            for _, future in batch:
+                future.set_result(None)
+
+    async def close(self):
+        while self._queue:
+            await asyncio.sleep(0.01)
+        if self._task is not None:
+            self._task.cancel()
+
+
+class HabitServer:
+    def __init__(self, tracker, committer):
+        self.tracker = tracker
+        self.committer = committer
+
+    # === Handlers ===
+    def _habit(self, name):
+        habit = self.tracker.find_habit(name)
+        if habit is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No habit named {name!r}")
+        return habit
+
+    async def _fetch(self, habits):
+        # Run the pending history loaders (SQLite queries) on a worker thread; the rows
+        # are parsed here on first use as usual
+        loaders = [(h, h._pending) for h in habits if callable(h._pending)]
+        if not loaders:
+            return
+        rows = await asyncio.get_running_loop().run_in_executor(None, lambda: [load() for _, load in loaders])
+        for (habit, load), raw in zip(loaders, rows):
+            if habit._pending is load:
+                habit._pending = raw
+
+    async def list_habits(self):
+        await self._fetch(self.tracker.get_habits())
+        return [
+            {'name': h.name, 'periodicity': h.periodicity, 'creation_dt': h.creation_dt,
+             'streak': analytics_cache.streak(h), 'completions': h.count_completions()}
+            for h in self.tracker.get_habits()
+        ]
+
+    async def add_habit(self, body):
+        name, periodicity = body.get('name'), body.get('periodicity', 'daily')
+        if not isinstance(name, str) or not name.strip():
+            raise HttpError(HTTPStatus.BAD_REQUEST, "name is required")
+        if not isinstance(periodicity, str):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "periodicity must be a string")
+        try:
+            added = self.tracker.add_habit(name.strip(), periodicity)
+        except (TypeError, ValueError) as e:
+            raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+        if not added:
+            raise HttpError(HTTPStatus.CONFLICT, f"Habit {name!r} already exists")
+        habit = self.tracker.find_habit(name.strip())
+        try:
+            await self.committer.commit({'op': 'add', 'name': habit.name, 'periodicity': habit.periodicity,
+                                         'creation_dt': habit.creation_dt})
+        except Exception:
+            if self.tracker.find_habit(habit.name) is habit:
+                self.tracker.delete_habit(habit.name)
+            raise
+        return HTTPStatus.CREATED, {'name': habit.name, 'periodicity': habit.periodicity,
+                                    'creation_dt': habit.creation_dt}
+
+    async def complete(self, name):
+        habit = self._habit(name)
+        await self._fetch([habit])
+        when = datetime.now()
+        ts = when.isoformat()
+        await self.committer.commit({'op': 'complete', 'name': habit.name, 'ts': ts})
+        habit.mark_completed(when)
+        return HTTPStatus.OK, {'name': habit.name, 'ts': ts, 'streak': analytics_cache.streak(habit)}
+
+    async def delete(self, name):
+        habit = self._habit(name)
+        await self.committer.commit({'op': 'delete', 'name': habit.name})
+        if self.tracker.find_habit(habit.name) is habit:
+            self.tracker.delete_habit(habit.name)
+        return HTTPStatus.NO_CONTENT, None
+
+    async def dispatch(self, method, path, body):
+        if not isinstance(body, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+        parts = [unquote(p) for p in path.split('?', 1)[0].strip('/').split('/')]
+        if parts == ['habits']:
+            if method == 'GET':
+                return HTTPStatus.OK, await self.list_habits()
+            if method == 'POST':
+                return await self.add_habit(body)
+        elif parts == ['rates'] and method == 'GET':
+            await self._fetch(self.tracker.get_habits())
+            return HTTPStatus.OK, analytics_cache.get_completion_rates(self.tracker)
+        elif len(parts) == 2 and parts[0] == 'habits' and method == 'DELETE':
+            return await self.delete(parts[1])
+        elif len(parts) == 3 and parts[0] == 'habits':
+            if parts[2] == 'complete' and method == 'POST':
+                return await self.complete(parts[1])
+            if parts[2] == 'streak' and method == 'GET':
+                habit = self._habit(parts[1])
+                await self._fetch([habit])
+                return HTTPStatus.OK, {'current': analytics_cache.streak(habit),
+                                       'longest': analytics_cache.longest_streak(habit)}
+            if parts[2] == 'rate' and method == 'GET':
+                habit = self._habit(parts[1])
+                await self._fetch([habit])
+                return HTTPStatus.OK, {'rate': analytics_cache.completion_rate(habit)}
+        raise HttpError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+    # === HTTP/1.1 with keep-alive ===
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                raw = await reader.readexactly(int(headers.get('content-length', 0)))
+                try:
+                    body = json.loads(raw) if raw else {}
+                    status, payload = await self.dispatch(method, path, body)
+                except HttpError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except ValueError as e:
+                    status, payload = HTTPStatus.BAD_REQUEST, {'error': str(e)}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+                data = json.dumps(payload).encode() if payload is not None else b''
+                writer.write(
+                    f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                    f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n'.encode() + data
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, store):
+    tracker = HabitTracker()
+    tracker.habits = await asyncio.get_running_loop().run_in_executor(None, store.load_data, True)
+    committer = GroupCommitter(store)
+    committer.start()
+    app = HabitServer(tracker, committer)
+    server = await asyncio.start_server(app.handle, host, port)
+    print(f"Serving {len(tracker.get_habits())} habits on http://{host}:{port}", file=sys.stderr, flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await committer.close()
+        print(f"{committer.events} events in {committer.batches} writes", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    store = DataManager
+    if os.environ.get('HABIT_SQLITE') == '1':
+        from sqlite_manager import SqliteDataManager
+        store = SqliteDataManager
+    try:
+        asyncio.run(serve(args.host, args.port, store))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
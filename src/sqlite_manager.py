@@ -0,0 +1,274 @@
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+from habit import Habit, stored_periodicity
+from data_manager import DataManager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS habits (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    periodicity TEXT NOT NULL,
+    creation_dt TEXT NOT NULL,
+    creation_day INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completions (
+    habit_id INTEGER NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+    day INTEGER NOT NULL,
+    ts TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_habit_day ON completions (habit_id, day);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# Map each completion to its period number (same numbering as streaks.bucket_of up to
+# a constant); day + 1721424.5 is the Julian day SQLite's date functions expect.
+PERIODS = """
+SELECT DISTINCT c.habit_id,
+    CASE h.periodicity
+        WHEN 'daily' THEN c.day
+        WHEN 'weekly' THEN (c.day - 1) / 7
+        WHEN 'monthly' THEN CAST(strftime('%Y', c.day + 1721424.5) AS INTEGER) * 12
+                          + CAST(strftime('%m', c.day + 1721424.5) AS INTEGER) - 1
+        ELSE (c.day - h.creation_day - (CASE WHEN c.day < h.creation_day
+                                        THEN CAST(h.periodicity AS INTEGER) - 1 ELSE 0 END))
+             / CAST(h.periodicity AS INTEGER)
+    END AS period
+FROM completions c JOIN habits h ON h.id = c.habit_id
+"""
+
+# Gaps-and-islands: consecutive periods share the same (period - row_number) group
+RUNS = """
+WITH periods AS (""" + PERIODS + """),
+grouped AS (
+    SELECT habit_id, period, period - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY period) AS grp
+    FROM periods
+),
+runs AS (
+    SELECT habit_id, COUNT(*) AS length, MAX(period) AS last
+    FROM grouped GROUP BY habit_id, grp
+)
+"""
+
+
+def _day(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.toordinal()
+
+
+class SqliteDataManager:
+    FILE = 'data.db'
+    BATCH_SIZE = 5000
+
+    # Every mutation is its own small transaction, same contract as DataManager's journal mode
+    journal_mode = True
+
+    _lock = threading.RLock()
+    _conn = None
+    _saved = {}  # habit name -> number of completions already in the database
+    _generations = {}  # habit name -> Habit.generation those rows were saved from
+
+    @staticmethod
+    def connect():
+        with SqliteDataManager._lock:
+            if SqliteDataManager._conn is None:
+                conn = sqlite3.connect(SqliteDataManager.FILE, check_same_thread=False)
+                conn.execute('PRAGMA foreign_keys = ON')
+                conn.execute('PRAGMA journal_mode = WAL')
+                conn.executescript(SCHEMA)
+                SqliteDataManager._conn = conn
+                SqliteDataManager.migrate_from_json()
+        return SqliteDataManager._conn
+
+    @staticmethod
+    def close():
+        if SqliteDataManager._conn is not None:
+            SqliteDataManager._conn.close()
+            SqliteDataManager._conn = None
+
+    @staticmethod
+    def migrate_from_json():
+        # One-shot import of DataManager.FILE into an empty database
+        conn = SqliteDataManager._conn
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+        if done or not os.path.exists(DataManager.FILE):
+            return False
+        if conn.execute('SELECT 1 FROM habits LIMIT 1').fetchone():
+            return False
+        habits = DataManager.load_data()
+        with SqliteDataManager._lock, conn:
+            for habit in habits:
+                SqliteDataManager._insert_habit(conn, habit)
+                SqliteDataManager._insert_completions(conn, habit, habit.completion_dt)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (DataManager.FILE,))
+        return True
+
+    @staticmethod
+    def save_data(habits):
+        # Sync only what changed since the last save/load, in one transaction
+        conn = SqliteDataManager.connect()
+        saved = SqliteDataManager._saved
+        generations = SqliteDataManager._generations
+        with SqliteDataManager._lock, conn:
+            names = set()
+            for habit in habits:
+                names.add(habit.name)
+                count = saved.get(habit.name)
+                if count is None:
+                    SqliteDataManager._insert_habit(conn, habit)
+                    count = 0
+                elif habit.generation != generations.get(habit.name):
+                    # History replaced since those rows were written (a reset, or the habit was
+                    # deleted and added again): rewrite the habit's rows
+                    conn.execute(
+                        'UPDATE habits SET periodicity = ?, creation_dt = ?, creation_day = ? WHERE name = ?',
+                        (habit.periodicity, habit.creation_dt, _day(habit.creation_dt), habit.name)
+                    )
+                    conn.execute(
+                        'DELETE FROM completions WHERE habit_id = (SELECT id FROM habits WHERE name = ?)',
+                        (habit.name,)
+                    )
+                    count = saved[habit.name] = 0
+                elif not habit.loaded:
+                    continue  # history never parsed, so it cannot have changed
+                SqliteDataManager._insert_completions(conn, habit, habit.completion_dt[count:])
+                generations[habit.name] = habit.generation
+            for name in [n for n in saved if n not in names]:
+                conn.execute('DELETE FROM habits WHERE name = ?', (name,))
+                del saved[name]
+                generations.pop(name, None)
+
+    @staticmethod
+    def load_data(lazy=False):
+        # lazy=True only reads habit rows; each history is queried on first use
+        conn = SqliteDataManager.connect()
+        habits = []
+        saved = {}
+        with SqliteDataManager._lock:
+            rows = conn.execute('SELECT id, name, periodicity, creation_dt FROM habits ORDER BY id').fetchall()
+            if lazy:
+                counts = dict(conn.execute('SELECT habit_id, COUNT(*) FROM completions GROUP BY habit_id'))
+            else:
+                history = {}
+                for habit_id, ts in conn.execute('SELECT habit_id, ts FROM completions ORDER BY habit_id, rowid'):
+                    history.setdefault(habit_id, []).append(ts)
+        for habit_id, name, periodicity, creation_dt in rows:
+            if lazy:
+                completion_dt = SqliteDataManager._history_loader(habit_id) if counts.get(habit_id) else []
+                saved[name] = counts.get(habit_id, 0)
+            else:
+                completion_dt = history.get(habit_id, [])
+                saved[name] = len(completion_dt)
+            habits.append(Habit(name, stored_periodicity(name, periodicity), creation_dt, completion_dt, lazy=lazy))
+        SqliteDataManager._saved = saved
+        SqliteDataManager._generations = {habit.name: habit.generation for habit in habits}
+        return habits
+
+    @staticmethod
+    def _history_loader(habit_id):
+        def load():
+            with SqliteDataManager._lock:
+                rows = SqliteDataManager.connect().execute(
+                    'SELECT ts FROM completions WHERE habit_id = ? ORDER BY rowid', (habit_id,)
+                )
+                return [ts for (ts,) in rows]
+        return load
+
+    @staticmethod
+    def append_event(op, **fields):
+        SqliteDataManager.append_events([dict(fields, op=op)])
+
+    @staticmethod
+    def append_events(events):
+        # All events go in one transaction
+        conn = SqliteDataManager.connect()
+        saved = SqliteDataManager._saved
+        with SqliteDataManager._lock, conn:
+            for fields in events:
+                op = fields['op']
+                if op == 'add':
+                    conn.execute(
+                        'INSERT OR IGNORE INTO habits (name, periodicity, creation_dt, creation_day) VALUES (?, ?, ?, ?)',
+                        (fields['name'], fields['periodicity'], fields['creation_dt'], _day(fields['creation_dt']))
+                    )
+                    saved.setdefault(fields['name'], 0)
+                elif op == 'complete':
+                    conn.execute(
+                        'INSERT INTO completions (habit_id, day, ts) SELECT id, ?, ? FROM habits WHERE name = ?',
+                        (_day(fields['ts']), fields['ts'], fields['name'])
+                    )
+                    saved[fields['name']] = saved.get(fields['name'], 0) + 1
+                elif op == 'delete':
+                    conn.execute('DELETE FROM habits WHERE name = ?', (fields['name'],))
+                    saved.pop(fields['name'], None)
+                    SqliteDataManager._generations.pop(fields['name'], None)
+                elif op == 'reset':
+                    conn.execute('DELETE FROM completions')
+                    for name in saved:
+                        saved[name] = 0
+
+    @staticmethod
+    def _insert_habit(conn, habit):
+        conn.execute(
+            'INSERT OR IGNORE INTO habits (name, periodicity, creation_dt, creation_day) VALUES (?, ?, ?, ?)',
+            (habit.name, habit.periodicity, habit.creation_dt, _day(habit.creation_dt))
+        )
+
+    @staticmethod
+    def _insert_completions(conn, habit, completion_dt):
+        habit_id = conn.execute('SELECT id FROM habits WHERE name = ?', (habit.name,)).fetchone()[0]
+        for i in range(0, len(completion_dt), SqliteDataManager.BATCH_SIZE):
+            conn.executemany(
+                'INSERT INTO completions (habit_id, day, ts) VALUES (?, ?, ?)',
+                [(habit_id, _day(ts), ts) for ts in completion_dt[i:i + SqliteDataManager.BATCH_SIZE]]
+            )
+        SqliteDataManager._saved[habit.name] = SqliteDataManager._saved.get(habit.name, 0) + len(completion_dt)
+
+    # === Queries pushed down to SQL ===
+    @staticmethod
+    def count_completions(name, start=None, end=None):
+        # Distinct completed days for a habit, optionally within [start, end]
+        sql = 'SELECT COUNT(DISTINCT day) FROM completions c JOIN habits h ON h.id = c.habit_id WHERE h.name = ?'
+        params = [name]
+        if start is not None:
+            sql += ' AND c.day >= ?'
+            params.append(_day(start))
+        if end is not None:
+            sql += ' AND c.day <= ?'
+            params.append(_day(end))
+        with SqliteDataManager._lock:
+            return SqliteDataManager.connect().execute(sql, params).fetchone()[0]
+
+    @staticmethod
+    def streaks():
+        # {name: (current streak, longest streak)} for every habit
+        sql = RUNS + """
+            SELECT h.name,
+                COALESCE((SELECT length FROM runs r WHERE r.habit_id = h.id ORDER BY last DESC LIMIT 1), 0),
+                COALESCE((SELECT MAX(length) FROM runs r WHERE r.habit_id = h.id), 0)
+            FROM habits h ORDER BY h.id
+        """
+        with SqliteDataManager._lock:
+            rows = SqliteDataManager.connect().execute(sql).fetchall()
+        return {name: (current, longest) for name, current, longest in rows}
+
+    @staticmethod
+    def completion_rates(today=None):
+        # {name: percentage of days since creation with at least one completion}
+        today = _day(today or date.today())
+        sql = """
+            SELECT h.name, h.creation_day, COUNT(DISTINCT c.day)
+            FROM habits h LEFT JOIN completions c ON c.habit_id = h.id
+            GROUP BY h.id ORDER BY h.id
+        """
+        with SqliteDataManager._lock:
+            rows = SqliteDataManager.connect().execute(sql).fetchall()
+        rates = {}
+        for name, creation_day, completed in rows:
+            total = today - creation_day + 1
+            rates[name] = round(completed / total * 100, 2) if completed and total > 0 else 0
+        return rates
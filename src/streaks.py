@@ -0,0 +1,107 @@
+from array import array
+from bisect import bisect_left
+from datetime import date
+
+# Periodicities understood by the streak engine: 'daily', 'weekly' (ISO weeks),
+# 'monthly' (calendar months) and '<N>-day' for a custom cadence anchored on creation.
+PERIODICITIES = ('daily', 'weekly', 'monthly')
+
+def cadence(periodicity):
+    # Length in days of a '<N>-day' periodicity, or None for the named ones
+    if periodicity.endswith('-day'):
+        n = int(periodicity[:-len('-day')])
+        if n < 1:
+            raise ValueError(f"Invalid periodicity: {periodicity!r}")
+        return n
+    if periodicity not in PERIODICITIES:
+        raise ValueError(f"Invalid periodicity: {periodicity!r}")
+    return None
+
+def normalize_periodicity(periodicity):
+    # Canonical spelling of a periodicity ('Weekly ' -> 'weekly'); ValueError if there is none
+    if not isinstance(periodicity, str):
+        raise ValueError(f"Invalid periodicity: {periodicity!r}")
+    periodicity = periodicity.strip().lower()
+    cadence(periodicity)
+    return periodicity
+
+def bucket_of(periodicity, anchor=0):
+    """Return a function mapping a day ordinal to its period number.
+
+    Consecutive periods map to consecutive integers, so a streak is a run of
+    consecutive bucket numbers whatever the periodicity.
+    """
+    n = cadence(periodicity)
+    if n is not None:
+        return lambda day: (day - anchor) // n
+    if periodicity == 'daily':
+        return lambda day: day
+    if periodicity == 'weekly':
+        return lambda day: (day - 1) // 7  # ordinal 1 (0001-01-01) was a Monday
+    def month(day):
+        d = date.fromordinal(day)
+        return d.year * 12 + d.month - 1
+    return month
+
+def period_start(periodicity, anchor=0):
+    """Return the inverse of bucket_of: a period number to the ordinal of its first day."""
+    n = cadence(periodicity)
+    if n is not None:
+        return lambda bucket: anchor + bucket * n
+    if periodicity == 'daily':
+        return lambda bucket: bucket
+    if periodicity == 'weekly':
+        return lambda bucket: bucket * 7 + 1
+    return lambda bucket: date(bucket // 12, bucket % 12 + 1, 1).toordinal()
+
+class StreakCounter:
+    """Current and longest streak over period buckets, updated per completion.
+
+    Filled buckets are kept in a sorted array and runs of consecutive buckets
+    in two boundary maps, so adding a completion in the latest period is O(1)
+    amortized and back-filling an older one is a bisect insert.
+    """
+    __slots__ = ('bucket', '_buckets', '_run_start', '_run_end', 'current', 'longest')
+
+    def __init__(self, periodicity, anchor=0, days=()):
+        self.bucket = bucket_of(periodicity, anchor)
+        self._buckets = array('i')
+        self._run_start = {}   # run end -> run start
+        self._run_end = {}     # run start -> run end
+        self.current = 0
+        self.longest = 0
+        for day in days:
+            self.add(day)
+
+    def add(self, day):
+        b = self.bucket(day)
+        buckets = self._buckets
+        if buckets and b >= buckets[-1]:
+            if b == buckets[-1]:
+                return  # period already counted
+            buckets.append(b)
+        else:
+            i = bisect_left(buckets, b)
+            if i < len(buckets) and buckets[i] == b:
+                return
+            buckets.insert(i, b)
+        # Merge the new bucket with the runs ending just before and starting just after it
+        start = self._run_start.pop(b - 1, b)
+        end = self._run_end.pop(b + 1, b)
+        self._run_end[start] = end
+        self._run_start[end] = start
+        length = end - start + 1
+        if length > self.longest:
+            self.longest = length
+        if end == buckets[-1]:
+            self.current = length
+
+    def copy(self):
+        other = StreakCounter.__new__(StreakCounter)
+        other.bucket = self.bucket
+        other._buckets = self._buckets[:]
+        other._run_start = self._run_start.copy()
+        other._run_end = self._run_end.copy()
+        other.current = self.current
+        other.longest = self.longest
+        return other
@@ -0,0 +1,138 @@
+"""Several processes writing the same data file at once.
+
+    python stress_writers.py --writers 8 --iterations 200
+    python stress_writers.py --mode mixed --binary -o stress.json
+    python stress_writers.py --mode journal --readers 4
+
+Each writer loads the data once, then completes a shared habit and its own
+habit with unique timestamps, committing after every completion: a full
+save_data in `save` mode, a journal append in `journal` mode, and half of the
+writers each way in `mixed` mode. `--readers` processes meanwhile reload the
+data in a loop, so loads race with appends and saves; a reader whose load
+sees fewer completions than its previous one counts a regression. Afterwards
+every expected completion is looked up in the merged file. The report (lost
+completions, regressions, commits/s) is printed as JSON and the exit status
+is 1 if anything was lost or went backwards.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from data_manager import DataManager
+from tracker import HabitTracker
+
+START = datetime(2000, 1, 1)
+
+
+def use_dir(workdir, binary):
+    DataManager.binary = binary
+    DataManager.FILE = os.path.join(workdir, 'data.bin' if binary else 'data.json')
+    DataManager.JOURNAL = os.path.join(workdir, 'data.journal')
+
+
+def stamp(writer, k, iterations):
+    return START + timedelta(seconds=writer * iterations + k)
+
+
+def writer(workdir, binary, index, iterations, journal, barrier):
+    use_dir(workdir, binary)
+    tracker = HabitTracker()
+    tracker.habits = DataManager.load_data(lazy=True)
+    names = ('shared', f'writer-{index}')
+    for name in names:
+        if tracker.add_habit(name, 'daily', START.isoformat()) and journal:
+            DataManager.append_event('add', name=name, periodicity='daily', creation_dt=START.isoformat())
+    barrier.wait()
+    start = time.perf_counter()
+    for k in range(iterations):
+        when = stamp(index, k, iterations)
+        for name in names:
+            habit = tracker.find_habit(name)
+            habit.mark_completed(when)
+            if journal:
+                DataManager.append_event('complete', name=name, ts=habit.completion_dt[-1])
+        if not journal:
+            DataManager.save_data([h.copy() for h in tracker.get_habits()])
+    return time.perf_counter() - start
+
+
+def reader(workdir, binary, stop):
+    use_dir(workdir, binary)
+    loads = regressions = previous = 0
+    while not stop.is_set():
+        seen = sum(len(h.completion_dt) for h in DataManager.load_data())
+        regressions += seen < previous
+        previous = seen
+        loads += 1
+    return loads, regressions
+
+
+def run(writers, iterations, mode, binary, readers=0):
+    workdir = tempfile.mkdtemp(prefix='habit-stress-')
+    try:
+        use_dir(workdir, binary)
+        ctx = multiprocessing.get_context('spawn')
+        manager = ctx.Manager()
+        barrier, stop = manager.Barrier(writers), manager.Event()
+        with ctx.Pool(writers + readers) as pool:
+            watching = [pool.apply_async(reader, (workdir, binary, stop)) for _ in range(readers)]
+            jobs = [pool.apply_async(writer, (workdir, binary, i, iterations,
+                                              mode == 'journal' or (mode == 'mixed' and i % 2), barrier))
+                    for i in range(writers)]
+            busy = [job.get() for job in jobs]
+            stop.set()
+            reads = [job.get() for job in watching]
+
+        habits = {h.name: h for h in DataManager.load_data()}
+        lost = 0
+        for i in range(writers):
+            expected = {stamp(i, k, iterations).isoformat() for k in range(iterations)}
+            for name in ('shared', f'writer-{i}'):
+                have = set(habits[name].completion_dt) if name in habits else set()
+                lost += len(expected - have)
+        seconds = max(busy)
+        return {
+            'writers': writers,
+            'iterations': iterations,
+            'mode': mode,
+            'format': 'binary' if binary else 'json',
+            'completions': 2 * writers * iterations,
+            'lost': lost,
+            'readers': readers,
+            'loads': sum(loads for loads, _ in reads),
+            'regressions': sum(regressions for _, regressions in reads),
+            'seconds': round(seconds, 3),
+            'commits_per_s': round(writers * iterations / seconds, 1) if seconds else 0,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--mode', choices=['save', 'journal', 'mixed'], default='save')
+    parser.add_argument('--readers', type=int, default=0, help='processes reloading the data meanwhile')
+    parser.add_argument('--binary', action='store_true', help='use the columnar snapshot format')
+    parser.add_argument('-o', '--output')
+    args = parser.parse_args(argv)
+
+    report = run(args.writers, args.iterations, args.mode, args.binary, args.readers)
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report['lost'] or report['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,75 @@
+import warnings
+
 from habit import Habit
 
 class HabitTracker:
     def __init__(self):
+        self.version = 0  # bumped when habits are added or removed or a member habit changes
+        self._listeners = []
         self.habits = []
 
-    def add_habit(self, name, periodicity):
-        habit = Habit(name, periodicity)
-        self.habits.append(habit)
+    # Listeners are called as listener(event, habit) right after each change:
+    # 'added', 'removed', 'completed' (completions appended), 'changed' (history replaced),
+    # and 'reloaded' with habit None when the whole habit list is replaced
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self, event, habit):
+        for listener in tuple(self._listeners):
+            listener(event, habit)
+
+    # Habits are indexed by case-folded name; dicts keep insertion order
+    @property
+    def habits(self):
+        if self._list is None:
+            self._list = list(self._index.values())
+        return self._list
+
+    @habits.setter
+    def habits(self, habits):
+        self._index = {}
+        merged = []
+        for habit in habits:
+            first = self._index.setdefault(habit.name.casefold(), habit)
+            if first is not habit:
+                # Older files can hold names that differ only in case, or repeat one;
+                # the first keeps both histories rather than losing the other
+                known = set(first.completion_dt)
+                first.extend_completions([dt for dt in habit.completion_dt if dt not in known])
+                merged.append(habit.name)
+        for habit in self._index.values():
+            habit._tracker = self
+        if merged:
+            warnings.warn(f"Merged habits with duplicate names into the first of each: {', '.join(merged)}")
+        self._list = None
+        self.version += 1
+        self._notify('reloaded', None)
+
+    def add_habit(self, name, periodicity, creation_dt=None):
+        key = name.casefold()
+        if key in self._index:
+            return False
+        habit = self._index[key] = Habit(name, periodicity, creation_dt)
+        habit._tracker = self
+        self._list = None
+        self.version += 1
+        self._notify('added', habit)
+        return True
 
     def delete_habit(self, name):
-        self.habits = [h for h in self.habits if h.name != name]
+        habit = self._index.pop(name.casefold(), None)
+        if habit is None:
+            return False
+        habit._tracker = None
+        habit._changed()
+        self._list = None
+        self.version += 1
+        self._notify('removed', habit)
+        return True
 
     def get_habits(self):
         return self.habits
 
     def find_habit(self, name):
-        return next((h for h in self.habits if h.name == name), None)
+        return self._index.get(name.casefold())
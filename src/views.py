@@ -0,0 +1,222 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class PagedTree:
+    """Treeview that only inserts rows as they are scrolled into view.
+
+    Each level is fed from a sequence (anything with len() and slicing) plus a
+    render function returning (text, values, children). Rows are inserted a
+    page at a time when the "more" marker at the end of a level becomes
+    visible, and a row's children are only inserted once it is expanded.
+    """
+
+    PAGE = 200
+
+    def __init__(self, parent, columns=(), headings=(), tree_heading="", height=20, font=None):
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=columns, height=height, show="tree headings")
+        self.tree.heading("#0", text=tree_heading, anchor="w")
+        for column, heading in zip(columns, headings):
+            self.tree.heading(column, text=heading, anchor="w")
+            self.tree.column(column, width=120, stretch=False)
+        self._scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self._scrollbar.pack(side="right", fill="y")
+        if font:
+            ttk.Style(parent).configure("Treeview", font=font)
+
+        self._levels = {}      # parent iid -> [rows, next index, render, child render]
+        self._lazy = {}        # collapsed iid -> (children, render) not inserted yet
+        self._pending = set()  # levels with a page load already queued
+        self._iids = {}        # id() of a top-level row -> iid, for rows inserted so far
+        self._owned = None     # top-level rows once copied for patching
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_rows(self, rows, render, child_render=None, parent=""):
+        self.tree.delete(*self.tree.get_children(parent))
+        if parent == "":
+            self._levels.clear()
+            self._lazy.clear()
+            self._iids.clear()
+            self._owned = None
+        self._levels[parent] = [rows, 0, render, child_render]
+        self._load_page(parent)
+
+    def _load_page(self, parent):
+        self._pending.discard(parent)
+        level = self._levels.get(parent)
+        if level is None or (parent and not self.tree.exists(parent)):
+            return
+        rows, start = level[0], level[1]
+        end = min(start + self.PAGE, len(rows))
+        for row in rows[start:end]:
+            self._insert(parent, row, level)
+        level[1] = end
+        self._refresh_more(parent)
+
+    def _insert(self, parent, row, level):
+        more = f"{parent}::more"
+        index = self.tree.index(more) if self.tree.exists(more) else "end"
+        text, values, children = level[2](row)
+        iid = self.tree.insert(parent, index, text=text, values=values, open=False)
+        if parent == "":
+            self._iids[id(row)] = iid
+        self._set_children(iid, children, level[3])
+
+    def _set_children(self, iid, children, render):
+        if children is not None and len(children):
+            # Placeholder so the expand arrow shows without inserting the children
+            self.tree.insert(iid, "end", text="…")
+            self._lazy[iid] = (children, render)
+
+    def _refresh_more(self, parent):
+        # Keep the "more" marker last and its count in step with the rows not inserted yet
+        rows, end = self._levels[parent][:2]
+        more = f"{parent}::more"
+        if end >= len(rows):
+            if self.tree.exists(more):
+                self.tree.delete(more)
+        elif self.tree.exists(more):
+            self.tree.item(more, text=f"… {len(rows) - end} more")
+        else:
+            self.tree.insert(parent, "end", iid=more, text=f"… {len(rows) - end} more")
+
+    # === Patching top-level rows in place ===
+    def _own_rows(self):
+        # Copy the caller's sequence before the first patch so it is never modified
+        level = self._levels[""]
+        if not isinstance(level[0], list) or level[0] is not self._owned:
+            level[0] = self._owned = list(level[0])
+        return level[0]
+
+    def add_row(self, row):
+        rows = self._own_rows()
+        level = self._levels[""]
+        rows.append(row)
+        if level[1] == len(rows) - 1:
+            # Everything before it is inserted already, so it can go straight in
+            self._insert("", row, level)
+            level[1] += 1
+        self._refresh_more("")
+
+    def update_row(self, row):
+        # Rows not inserted yet are rendered fresh when they scroll into view
+        iid = self._iids.get(id(row))
+        if iid is None:
+            return
+        level = self._levels[""]
+        text, values, children = level[2](row)
+        self.tree.item(iid, text=text, values=values)
+        self._drop_children(iid)
+        if self.tree.item(iid, "open") and children is not None and len(children):
+            self.set_rows(children, level[3], parent=iid)
+        else:
+            self.tree.item(iid, open=False)
+            self._set_children(iid, children, level[3])
+
+    def remove_row(self, row):
+        rows = self._own_rows()
+        level = self._levels[""]
+        index = next((i for i, r in enumerate(rows) if r is row), None)
+        if index is None:
+            return
+        del rows[index]
+        if index < level[1]:
+            level[1] -= 1
+        iid = self._iids.pop(id(row), None)
+        if iid is not None:
+            self._drop_children(iid)
+            self.tree.delete(iid)
+        self._refresh_more("")
+
+    def _drop_children(self, iid):
+        self.tree.delete(*self.tree.get_children(iid))
+        self._lazy.pop(iid, None)
+        self._levels.pop(iid, None)
+        self._pending.discard(iid)
+
+    def apply(self, changes):
+        # changes maps row -> 'added', 'updated' or 'removed', as delivered by TrackerWatch
+        for row, change in changes.items():
+            if change == 'added':
+                self.add_row(row)
+            elif change == 'updated':
+                self.update_row(row)
+            else:
+                self.remove_row(row)
+
+    def _on_open(self, event):
+        iid = self.tree.focus()
+        lazy = self._lazy.pop(iid, None)
+        if lazy is not None:
+            children, render = lazy
+            self.set_rows(children, render, parent=iid)
+
+    def _on_scroll(self, first, last):
+        self._scrollbar.set(first, last)
+        # Queue the next page of every level whose "more" marker is on screen
+        for parent in self._levels:
+            more = f"{parent}::more"
+            if parent not in self._pending and self.tree.exists(more) and self.tree.bbox(more):
+                self._pending.add(parent)
+                self.tree.after_idle(self._load_page, parent)
+
+
+class TrackerWatch:
+    """Subscribes to a HabitTracker and delivers its changes once per Tk idle cycle.
+
+    Events are collected per habit and collapsed to one change: 'added',
+    'updated' or 'removed' (nothing at all for a habit added and removed
+    again). `apply(changes)` gets that dict, or None after the whole habit
+    list was replaced. The subscription ends when `widget` is destroyed.
+    """
+
+    def __init__(self, widget, tracker, apply):
+        self._widget = widget
+        self._apply = apply
+        self._events = {}       # habit -> [first event, last event]
+        self._reloaded = False
+        self._scheduled = False
+        self._unsubscribe = tracker.subscribe(self._on_event)
+        widget.bind("<Destroy>", self._on_destroy, add="+")
+
+    def _on_event(self, event, habit):
+        if event == 'reloaded':
+            self._reloaded = True
+            self._events.clear()
+        else:
+            seen = self._events.get(habit)
+            if seen is None:
+                self._events[habit] = [event, event]
+            else:
+                seen[1] = event
+        if not self._scheduled:
+            self._scheduled = True
+            self._widget.after_idle(self._flush)
+
+    def _flush(self):
+        self._scheduled = False
+        events, self._events = self._events, {}
+        if self._reloaded:
+            self._reloaded = False
+            self._apply(None)
+            return
+        changes = {}
+        for habit, (first, last) in events.items():
+            if last == 'removed':
+                if first != 'added':
+                    changes[habit] = 'removed'
+            else:
+                changes[habit] = 'added' if first == 'added' else 'updated'
+        if changes:
+            self._apply(changes)
+
+    def _on_destroy(self, event):
+        if event.widget is self._widget and self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None